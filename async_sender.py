@@ -0,0 +1,426 @@
+"""
+Asyncio email sender
+AsyncEmailSender sends the same messages as EmailSender (related ->
+alternative text/html + inline cid:signature) from a single event loop, so it
+can run next to an async web service without threads.
+
+Requires aiosmtplib:
+    pip install aiosmtplib
+"""
+import asyncio
+import itertools
+import smtplib
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import aiosmtplib
+except ImportError:  # pragma: no cover - optional dependency
+    aiosmtplib = None
+
+from main import EmailSender, _interleave
+from manifest import Campaign
+from retry import is_transient
+from send_engine import CampaignResult, SendJob, SendResult, log_result
+from send_logging import flush_logging, logger
+from transports import LMTPTransport, SMTPTransport
+
+
+class _AsyncSession:
+    def __init__(self, client):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.message_count = 0
+
+
+class AsyncEmailSender(EmailSender):
+    def __init__(self, smtp_server: str, smtp_port: int, email: str, password: str,
+                 max_connections: int = 4, max_in_flight: int = 1000,
+                 max_messages_per_connection: int = 100, idle_timeout: float = 60.0, **kwargs):
+        """
+        Initialize the async email sender with SMTP configuration
+
+        Args:
+            smtp_server: SMTP server address (e.g., 'smtp.gmail.com')
+            smtp_port: SMTP port (e.g., 587 for TLS)
+            email: Sender email address
+            password: Sender email password or app password
+            max_connections: SMTP sessions open at the same time
+            max_in_flight: Deliveries queued or running at the same time;
+                producers wait when this many are pending (backpressure)
+            max_messages_per_connection: Messages sent before a session is reopened
+            idle_timeout: Seconds after which an idle session is reopened
+
+        Raises:
+            ValueError: If the transport is not SMTP (LMTP and pickup
+                directories are only supported by EmailSender)
+        """
+        if aiosmtplib is None:
+            raise ImportError("AsyncEmailSender requires aiosmtplib (pip install aiosmtplib)")
+        super().__init__(smtp_server, smtp_port, email, password,
+                         max_messages_per_connection=max_messages_per_connection,
+                         idle_timeout=idle_timeout, **kwargs)
+        if not isinstance(self.transport, SMTPTransport) or isinstance(self.transport, LMTPTransport):
+            raise ValueError(f"AsyncEmailSender sends over SMTP only, not {self.transport}")
+        # Text parts stay base64: the aiosmtplib sessions do not declare BODY=8BITMIME
+        self.eight_bit = False
+        self.max_connections = max(1, max_connections)
+        self.max_in_flight = max(self.max_connections, max_in_flight)
+        self._idle_sessions: List[_AsyncSession] = []
+        self._session_slots: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def _open_connection_async(self):
+        """
+        Open an SMTP session of the transport on the event loop
+        """
+        transport = self.transport
+        client = aiosmtplib.SMTP(hostname=transport.host, port=transport.port,
+                                 use_tls=transport.implicit_tls, start_tls=transport.starttls)
+        # STARTTLS happens during connect() and is timed with it
+        with self.metrics.timer('connect'):
+            await client.connect()
+        try:
+            if transport.username and transport.password:
+                with self.metrics.timer('auth'):
+                    await client.login(transport.username, transport.password)
+        except Exception:
+            client.close()
+            raise
+        self.metrics.count('connections')
+        return client
+
+    def _session_is_stale(self, session: _AsyncSession) -> bool:
+        if session.message_count >= self.pool.max_messages_per_connection:
+            return True
+        if time.monotonic() - session.last_used > self.pool.idle_timeout:
+            return True
+        return not session.client.is_connected
+
+    async def _close_session(self, session: _AsyncSession):
+        try:
+            await session.client.quit()
+        except Exception:
+            session.client.close()
+
+    async def _acquire_session(self) -> _AsyncSession:
+        while self._idle_sessions:
+            session = self._idle_sessions.pop()
+            if not self._session_is_stale(session):
+                return session
+            await self._close_session(session)
+        return _AsyncSession(await self._open_connection_async())
+
+    async def _send_message(self, data: bytes, all_recipients: List[str]) -> Dict[str, Tuple[int, str]]:
+        """
+        Send a message over a pooled session, reconnecting once if the server
+        dropped a reused session
+
+        Returns:
+            Recipients the server refused while accepting the others
+        """
+        if self._session_slots is None:
+            self._session_slots = asyncio.Semaphore(self.max_connections)
+        # Non-ASCII addresses need SMTPUTF8 (aiosmtplib refuses them if the
+        # server does not advertise it)
+        mail_options = [] if ''.join([self.email, *all_recipients]).isascii() else ['SMTPUTF8']
+        async with self._session_slots:
+            session = await self._acquire_session()
+            reused = session.message_count > 0
+            try:
+                with self.metrics.timer('data'):
+                    try:
+                        refused, _ = await session.client.sendmail(self.email, all_recipients, data, mail_options=mail_options)
+                    except aiosmtplib.SMTPServerDisconnected:
+                        if not reused:
+                            raise
+                        session.client.close()
+                        session = _AsyncSession(await self._open_connection_async())
+                        refused, _ = await session.client.sendmail(self.email, all_recipients, data, mail_options=mail_options)
+            except Exception:
+                session.client.close()
+                raise
+            self.metrics.count('bytes_sent', len(data))
+            session.message_count += 1
+            session.last_used = time.monotonic()
+            self._idle_sessions.append(session)
+        return {address: tuple(reply) for address, reply in refused.items()}
+
+    async def _deliver_async(self, job: SendJob, log_lines: Optional[List[str]] = None):
+        start = time.perf_counter()
+        try:
+            # Rendering, serialization and the image checks run off the event loop
+            data, all_recipients = await asyncio.to_thread(self._serialized, job)
+            if self.preview is not None:
+                await asyncio.to_thread(self.preview.write, job.name, data, all_recipients)
+                return
+            # Stay under the provider's sending quotas without blocking the loop
+            if self.rate_limiter:
+                delay = self.rate_limiter.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            retry = self.refused_to_retry(job.name, await self._send_message(data, all_recipients), log_lines)
+            if retry:
+                # Only the temporarily refused recipients get the email again
+                job.data, job.envelope = data, list(retry)
+                raise smtplib.SMTPRecipientsRefused(retry)
+        finally:
+            self.metrics.observe('email', time.perf_counter() - start)
+
+    async def send_email(self, recipients: List[str], subject: str, message: str, pole: str = "", recipient_name: str = "") -> bool:
+        """
+        Send HTML email to recipients with signature and CC
+
+        Args:
+            recipients: List of email addresses
+            subject: Email subject
+            message: Email body (plain text)
+            pole: Pole name for styling
+            recipient_name: Name of the recipient for unique message ID
+
+        Returns:
+            True if successful, False otherwise
+        """
+        job = SendJob(recipient_name, recipients, subject, message, pole)
+        for attempt in itertools.count(1):
+            try:
+                await self._deliver_async(job)
+                logger.info(self._success_line(recipients), extra={'event': 'sent', 'recipients': recipients})
+                self.metrics.count('sent')
+                return True
+            except Exception as e:
+                logger.error(f"Error sending email to {', '.join(recipients)}: {str(e)}",
+                             extra={'event': 'error', 'recipients': recipients, 'error': str(e), 'attempt': attempt})
+                if not self.retry_policy.should_retry(e, attempt):
+                    self.metrics.count('failed')
+                    return False
+                self.metrics.count('retries')
+                delay = self.retry_policy.delay(attempt)
+                logger.warning(f"⏳ Temporary failure, retrying in {delay:.0f}s (attempt {attempt + 1}/{self.retry_policy.max_attempts})")
+                await asyncio.sleep(delay)
+
+    async def send_job(self, job: SendJob) -> SendResult:
+        """
+        Send one job, collecting log lines instead of logging them
+        """
+        log_lines = [f"Sending email to {job.name} ({', '.join(job.recipients)})..."]
+        try:
+            await self._deliver_async(job, log_lines)
+            log_lines.append(self._success_line(job.recipients, job.include_cc))
+            return SendResult(job.name, job.recipients, True, log_lines=log_lines)
+        except Exception as e:
+            log_lines.append(f"Error sending email to {', '.join(job.recipients)}: {str(e)}")
+            return SendResult(job.name, job.recipients, False, str(e), log_lines, transient=is_transient(e))
+
+    async def send_bulk_email(self, csv_file: str, template_file: str, subject_suffix: str,
+                              batch_size: Optional[int] = None, campaign: Optional[str] = None) -> CampaignResult:
+        """
+        Send one email to all recipients from CSV (for announcements like AG convocations)
+
+        With a batch size, recipients are split into envelopes of at most
+        `batch_size` addresses, sent as Bcc (To shows the sender) while the
+        CSV is read. The CC list is copied on the first batch only.
+
+        Args:
+            csv_file: Path to CSV file
+            template_file: Path to template file
+            subject_suffix: Suffix for email subject
+            batch_size: Maximum recipients per envelope (defaults to
+                self.bulk_batch_size; None or 0 sends a single email)
+            campaign: Journal name of the campaign (defaults to the CSV file
+                and subject suffix)
+
+        Returns:
+            CampaignResult with one result per envelope
+        """
+        campaign = campaign or f"{csv_file}:{subject_suffix}"
+        batch_size = batch_size if batch_size is not None else self.bulk_batch_size
+        if not batch_size:
+            result = CampaignResult(csv_file)
+            bulk = await asyncio.to_thread(self._prepare_bulk_email, csv_file, template_file, subject_suffix)
+            if bulk is None:
+                return result
+            unique_recipients, subject, generic_message = bulk
+
+            job = SendJob("all_members", unique_recipients, subject, generic_message, subject_suffix)
+            if not any(self._unsent([job], campaign)):
+                return result
+            diverted = await asyncio.to_thread(self._divert, [job], campaign, csv_file)
+            if diverted is not None:
+                return diverted
+
+            success = await self.send_email(unique_recipients, subject, generic_message, subject_suffix, "all_members")
+            send_result = SendResult("all_members", unique_recipients, success)
+            result.add(await asyncio.to_thread(self._record, campaign, job, send_result))
+            return result
+
+        bulk = await asyncio.to_thread(self._bulk_message, template_file, subject_suffix)
+        if bulk is None:
+            return CampaignResult(csv_file)
+        subject, generic_message = bulk
+
+        logger.info(f"\nSending bulk email from {csv_file} in batches of {batch_size} recipients (Bcc)...")
+
+        read = 0
+
+        def batches():
+            nonlocal read
+            for job in self._bulk_batches(self._bulk_recipients(csv_file), subject, generic_message, subject_suffix, batch_size):
+                read += 1
+                yield job
+
+        jobs = self._unsent(batches(), campaign)
+        result = await asyncio.to_thread(self._divert, jobs, campaign, csv_file)
+        if result is None:
+            mark = self.metrics.mark()
+            result = await self._send_jobs(jobs, campaign, csv_file)
+            if read:
+                logger.info(f"{result.summary('batch(es)')} ({sum(len(r.recipients) for r in result.results)} recipients)")
+                logger.info(self.metrics.summary(mark))
+        if not read:
+            logger.warning(f"No emails found in {csv_file}")
+        flush_logging()
+        return result
+
+    async def process_csv_and_send(self, csv_file: str, template_file: str, subject_suffix: str, campaign: Optional[str] = None) -> CampaignResult:
+        """
+        Process a CSV file and send emails according to template
+
+        At most `max_in_flight` deliveries are pending at once; reading the
+        CSV waits for room in the queue.
+
+        Args:
+            csv_file: Path to CSV file
+            template_file: Path to template file
+            subject_suffix: Suffix for email subject (e.g., "Pole Projet")
+            campaign: Journal name of the campaign (defaults to the CSV file
+                and subject suffix)
+
+        Returns:
+            CampaignResult with the outcome for every recipient
+        """
+        campaign = campaign or f"{csv_file}:{subject_suffix}"
+        prepared = await asyncio.to_thread(self._prepare_campaign, csv_file, template_file, subject_suffix)
+        if prepared is None:
+            return CampaignResult(csv_file)
+        emails, template, subject = prepared
+
+        logger.info(f"\nProcessing {csv_file}...")
+        jobs = self._cc_digests(self._unsent(self._campaign_jobs(emails, template, subject, subject_suffix), campaign), campaign)
+        diverted = await asyncio.to_thread(self._divert, jobs, campaign, csv_file)
+        if diverted is not None:
+            return diverted
+        mark = self.metrics.mark()
+
+        result = await self._send_jobs(jobs, campaign, csv_file)
+
+        logger.info(result.summary())
+        logger.info(self.metrics.summary(mark))
+        flush_logging()
+        return result
+
+    async def send_campaigns(self, campaigns: List[Campaign], render_processes: Optional[int] = None,
+                             coalesce: bool = False) -> List[CampaignResult]:
+        """
+        Send several campaigns in one run, over the same SMTP sessions, as
+        EmailSender.send_campaigns does
+
+        Args:
+            campaigns: Campaigns to send (see manifest.load_manifest), with
+                distinct names
+            render_processes: Processes rendering personalized emails, shared
+                between the personalized campaigns (defaults to self.render_processes)
+            coalesce: Send the campaigns with the same non-personalized email
+                as Bcc batches, once per distinct address
+
+        Returns:
+            One CampaignResult per campaign, in the same order (campaigns
+            merged by `coalesce` share one result, in place of the first)
+        """
+        results, streams = await asyncio.to_thread(self._campaign_streams, campaigns, render_processes, coalesce)
+
+        if streams:
+            mark = self.metrics.mark()
+            sent = await self._send_jobs(_interleave(streams), "", "")
+            for result in sent.results:
+                results[result.campaign].add(result)
+            for result in results.values():
+                logger.info(result.summary())
+            logger.info(self.metrics.summary(mark))
+        flush_logging()
+        return list(results.values())
+
+    async def _send_jobs(self, jobs: Iterator[SendJob], campaign: str, label: str) -> CampaignResult:
+        """
+        Send jobs with up to `max_in_flight` deliveries pending, retrying
+        transient failures, and log their results in job order
+
+        Pulling the next job (CSV reading, journal lookups, HTML rendering)
+        and recording results in the journal run in a worker thread, so the
+        event loop never waits for the disk.
+        """
+        result = CampaignResult(label)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_connections)
+        finished = {}
+        next_to_report = 0
+
+        def report():
+            # Log in CSV order as soon as earlier jobs are done
+            nonlocal next_to_report
+            while next_to_report in finished:
+                send_result = finished.pop(next_to_report)
+                log_result(send_result)
+                result.add(send_result)
+                next_to_report += 1
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    queue.task_done()
+                    return
+                index, job = item
+                for attempt in itertools.count(1):
+                    send_result = await self.send_job(job)
+                    send_result.attempts = attempt
+                    if send_result.success or not send_result.transient or attempt >= self.retry_policy.max_attempts:
+                        break
+                    self.metrics.count('retries')
+                    # Only this worker waits; the others keep draining the queue
+                    await asyncio.sleep(self.retry_policy.delay(attempt))
+                self.metrics.count('sent' if send_result.success else 'failed')
+                # Jobs of a multi-campaign run are tagged with their campaign
+                send_result = await asyncio.to_thread(self._record, job.campaign or campaign, job, send_result)
+                send_result.campaign = job.campaign
+                finished[index] = send_result
+                report()
+                queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.max_in_flight)]
+        try:
+            for index in itertools.count():
+                job = await asyncio.to_thread(next, jobs, None)
+                if job is None:
+                    break
+                await queue.put((index, job))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        return result
+
+    async def aclose(self):
+        """
+        Close the SMTP sessions kept open between sends
+        """
+        sessions, self._idle_sessions = self._idle_sessions, []
+        for session in sessions:
+            await self._close_session(session)
+        self.close()
@@ -0,0 +1,56 @@
+"""
+Microbenchmark - Keyword highlighting
+Compares the word-by-word substitution with the single-pass KeywordHighlighter
+on the paragraphs of the shipped templates
+"""
+import os
+import time
+from highlighter import KeywordHighlighter, highlight_sequential
+from main import WELCOME_HIGHLIGHTS, ANNOUNCEMENT_HIGHLIGHTS
+
+TEMPLATES = [
+    ("templateMC.txt", WELCOME_HIGHLIGHTS),
+    ("templateProjet.txt", WELCOME_HIGHLIGHTS),
+    ("ConvocationAGetVisite.txt", ANNOUNCEMENT_HIGHLIGHTS),
+    ("MeetingAnnouncement.txt", ANNOUNCEMENT_HIGHLIGHTS),
+]
+
+
+def best_of(function, repeat: int = 5, number: int = 2000) -> float:
+    """
+    Best time of `repeat` runs of `number` calls, in seconds per call
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return best / number
+
+
+def main():
+    print("=== Keyword highlighting benchmark ===\n")
+    print(f"{'Template':<28}{'word by word':>14}{'single pass':>14}{'speedup':>10}")
+
+    for template_file, words in TEMPLATES:
+        if not os.path.exists(template_file):
+            print(f"⚠️  {template_file} not found, skipping")
+            continue
+
+        with open(template_file, 'r', encoding='utf-8') as file:
+            paragraphs = [p for p in file.read().strip().split('\n\n') if p.strip()]
+
+        sorted_words = sorted(words, key=len, reverse=True)
+        highlighter = KeywordHighlighter(words)
+
+        # Both implementations must agree before being compared
+        for paragraph in paragraphs:
+            assert highlighter.highlight(paragraph) == highlight_sequential(paragraph, sorted_words)
+
+        old = best_of(lambda: [highlight_sequential(p, sorted_words) for p in paragraphs])
+        new = best_of(lambda: [highlighter.highlight(p) for p in paragraphs])
+        print(f"{template_file:<28}{old * 1e6:>11.1f} µs{new * 1e6:>11.1f} µs{old / new:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Benchmark - Render and send hot paths
+Measures HTML rendering per template, send_email latency, campaign throughput,
+SMTP round trips per message and peak memory against a local SMTP sink (no
+real mail is sent), and saves the results to JSON so runs of different
+commits can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+from main import EmailSender
+from send_logging import setup_logging
+from smtp_sink import BASIC_EXTENSIONS, DEFAULT_EXTENSIONS, SMTPSink
+from transports import RelayTransport
+
+TEMPLATES = [
+    ("templateMC.txt", "Pole Marketing Commercial"),
+    ("templateProjet.txt", "Pole Projet"),
+    ("ConvocationAGetVisite.txt", "Convocation - AG et Visite CTJE"),
+    ("MeetingAnnouncement.txt", "Réunion Pôle Projet - Ce soir 20h00"),
+]
+CAMPAIGN_TEMPLATE = TEMPLATES[0]
+
+
+class SinkSender(EmailSender):
+    def __init__(self, smtp_server: str, smtp_port: int, email: str, password: str, **options):
+        """
+        Sender logging in to the local sink over plain SMTP (no STARTTLS)
+        """
+        options.setdefault('transport', RelayTransport(smtp_server, smtp_port, email, password))
+        super().__init__(smtp_server, smtp_port, email, password, **options)
+
+
+def sink_sender(sink: SMTPSink, **options) -> SinkSender:
+    """
+    Sender delivering to the sink, without CC so runs are reproducible
+    """
+    return SinkSender(sink.host, sink.port, "bench@sesame.com.tn", "bench", cc_list=[], **options)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    Nearest-rank percentile of a list of values
+    """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def best_of(function, repeat: int, number: int) -> float:
+    """
+    Best time of `repeat` runs of `number` calls, in seconds per call
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return best / number
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident memory of this process in MB (None where unsupported)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def write_csv(path: str, rows: int):
+    """
+    Write a recipients CSV with `rows` distinct members
+    """
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        file.write("name,mailSesame,mailAutre\n")
+        for i in range(rows):
+            file.write(f"Member {i},member{i}@sesame.com.tn,{f'member{i}@example.com' if i % 2 else ''}\n")
+
+
+def bench_convert_to_html(repeat: int = 5, number: int = 50) -> Dict[str, dict]:
+    """
+    Time convert_to_html and the compiled template on every template
+    """
+    results = {}
+    with SMTPSink() as sink:
+        sender = sink_sender(sink)
+        for template_file, pole in TEMPLATES:
+            if not os.path.exists(template_file):
+                print(f"⚠️  {template_file} not found, skipping")
+                continue
+            template = sender.read_template(template_file)
+            message = sender.personalize_message(template, "Member 0")
+            compiled = sender.compile_template(template, pole)
+            results[template_file] = {
+                'convert_to_html_us': best_of(lambda: sender.convert_to_html(message, pole), repeat, number) * 1e6,
+                'compiled_render_us': best_of(lambda: compiled.render("Member 0"), repeat, number) * 1e6,
+            }
+    return results
+
+
+def bench_send_email(count: int) -> dict:
+    """
+    Send `count` emails one by one with send_email and time each call
+    """
+    template_file, pole = CAMPAIGN_TEMPLATE
+    with SMTPSink() as sink:
+        sender = sink_sender(sink)
+        template = sender.read_template(template_file)
+        latencies = []
+        start = time.perf_counter()
+        for i in range(count):
+            name = f"Member {i}"
+            sent = time.perf_counter()
+            sender.send_email([f"member{i}@sesame.com.tn"], "Benchmark", sender.personalize_message(template, name), pole, name)
+            latencies.append(time.perf_counter() - sent)
+        elapsed = time.perf_counter() - start
+        sender.close()
+        delivered = sink.message_count
+
+    return {
+        'messages': delivered,
+        'seconds': elapsed,
+        'messages_per_second': delivered / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1e3,
+        'p99_ms': percentile(latencies, 99) * 1e3,
+        # Time spent in each phase (seconds), from the sender's metrics
+        'phases': sender.metrics.snapshot()['timings'],
+    }
+
+
+def bench_round_trips(rows: int) -> Dict[str, dict]:
+    """
+    Send the same campaign to a sink without pipelining nor 8BITMIME, then to
+    one advertising PIPELINING, 8BITMIME and SMTPUTF8, over a single session
+    """
+    template_file, pole = CAMPAIGN_TEMPLATE
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = os.path.join(directory, f"bench_{rows}.csv")
+        write_csv(csv_file, rows)
+        for label, extensions in (('basic', BASIC_EXTENSIONS), ('pipelining_8bitmime', DEFAULT_EXTENSIONS)):
+            with SMTPSink(extensions=extensions) as sink:
+                sender = sink_sender(sink, max_messages_per_connection=0)
+                start = time.perf_counter()
+                sender.process_csv_and_send(csv_file, template_file, pole)
+                elapsed = time.perf_counter() - start
+                sender.close()
+                results[label] = {
+                    'extensions': ' '.join(extensions),
+                    'messages': sink.message_count,
+                    # Session setup (greeting, EHLO, AUTH, QUIT) included
+                    'round_trips_per_message': sink.round_trips / sink.message_count,
+                    'kilobytes_per_message': sink.bytes_received / sink.message_count / 1024,
+                    'messages_per_second': sink.message_count / elapsed,
+                }
+    return results
+
+
+def run_campaign(rows: int, workers: int, render_processes: int) -> dict:
+    """
+    Send a personalized campaign of `rows` recipients (run in a child process
+    so its peak memory is measured alone)
+    """
+    template_file, pole = CAMPAIGN_TEMPLATE
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = os.path.join(directory, f"bench_{rows}.csv")
+        write_csv(csv_file, rows)
+        with SMTPSink() as sink:
+            sender = sink_sender(sink, pool_size=workers, render_processes=render_processes)
+            start = time.perf_counter()
+            result = sender.process_csv_and_send(csv_file, template_file, pole)
+            elapsed = time.perf_counter() - start
+            sender.close()
+
+            return {
+                'rows': rows,
+                'sent': len(result.sent),
+                'failed': len(result.failed),
+                'seconds': elapsed,
+                'messages_per_second': sink.message_count / elapsed,
+                'megabytes_sent': sink.bytes_received / (1024 * 1024),
+                'peak_rss_mb': peak_rss_mb(),
+            }
+
+
+def bench_campaigns(sizes: List[int], workers: int, render_processes: int) -> Dict[str, dict]:
+    """
+    Run one campaign per CSV size, each in a fresh interpreter
+    """
+    results = {}
+    for rows in sizes:
+        print(f"  {rows} rows...", flush=True)
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--campaign-child', str(rows),
+             '--workers', str(workers), '--render-processes', str(render_processes)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        results[str(rows)] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    """
+    Numeric values of nested results, by dotted path
+    """
+    values = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[prefix + key] = value
+    return values
+
+
+def compare(previous_file: str, results: dict):
+    """
+    Print the change of every measurement against a previous run
+    """
+    with open(previous_file, 'r', encoding='utf-8') as file:
+        previous = flatten(json.load(file)['results'])
+    current = flatten(results)
+
+    print(f"\n=== Compared with {previous_file} ===")
+    for key, value in current.items():
+        if key in previous and previous[key]:
+            change = (value - previous[key]) / previous[key] * 100
+            print(f"{key:<60}{previous[key]:>12.2f} → {value:>12.2f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rendering and sending against a local SMTP sink")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="CSV sizes of the campaign runs (default: 1000 10000 100000)")
+    parser.add_argument('--send-count', type=int, default=500, help="Emails sent to measure send_email latency")
+    parser.add_argument('--round-trip-rows', type=int, default=1000,
+                        help="CSV size of the round trip comparison (half the members have two addresses)")
+    parser.add_argument('--workers', type=int, default=4, help="Parallel SMTP sessions for the campaign runs")
+    parser.add_argument('--render-processes', type=int, default=1, help="Render processes for the campaign runs")
+    parser.add_argument('--output', help="JSON results file (default: benchmark-<commit>.json)")
+    parser.add_argument('--compare', metavar='JSON', help="Previous results file to compare with")
+    parser.add_argument('--campaign-child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Only problems are logged, the per-recipient lines would drown the results
+    setup_logging('WARNING')
+
+    # Templates and signature.png are looked up next to the scripts
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    if args.campaign_child is not None:
+        print(json.dumps(run_campaign(args.campaign_child, args.workers, args.render_processes)))
+        return
+
+    print("=== Render and send benchmark ===\n")
+    commit = git_commit()
+
+    print("convert_to_html per template...")
+    html = bench_convert_to_html()
+    for template_file, timings in html.items():
+        print(f"  {template_file:<28}{timings['convert_to_html_us']:>10.1f} µs"
+              f"  (compiled: {timings['compiled_render_us']:.1f} µs)")
+
+    print(f"send_email x {args.send_count}...")
+    send = bench_send_email(args.send_count)
+    print(f"  {send['messages_per_second']:.0f} msg/s, p50 {send['p50_ms']:.2f} ms, p99 {send['p99_ms']:.2f} ms")
+
+    print(f"Round trips per message x {args.round_trip_rows} rows...")
+    round_trips = bench_round_trips(args.round_trip_rows)
+    for label, run in round_trips.items():
+        print(f"  {run['extensions']:<42}{run['round_trips_per_message']:>6.2f} round trips, "
+              f"{run['kilobytes_per_message']:.1f} KB, {run['messages_per_second']:.0f} msg/s")
+
+    print(f"Campaigns ({args.workers} sessions, {args.render_processes} render process(es))...")
+    campaigns = bench_campaigns(args.sizes, args.workers, args.render_processes)
+    for rows, run in campaigns.items():
+        rss = f"{run['peak_rss_mb']:.0f} MB" if run['peak_rss_mb'] is not None else "n/a"
+        print(f"  {rows:>7} rows: {run['messages_per_second']:.0f} msg/s, peak RSS {rss}")
+
+    results = {'convert_to_html': html, 'send_email': send, 'round_trips': round_trips, 'campaigns': campaigns}
+    output = args.output or f"benchmark-{commit or time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump({
+            'commit': commit,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'settings': {'workers': args.workers, 'render_processes': args.render_processes},
+            'results': results,
+        }, file, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+if __name__ == "__main__":
+    main()
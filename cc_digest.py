@@ -0,0 +1,70 @@
+"""
+CC digests
+Instead of copying the CC list on every personalized email of a campaign,
+the CC addresses can get a single digest per campaign (or one every K
+emails): who the email is addressed to, and a copy of one of the emails.
+Digests are built as the jobs are queued, before their outcome is known.
+"""
+from typing import Iterable, Iterator, List, Optional
+
+from send_engine import SendJob
+
+# CC policies of EmailSender
+PER_MESSAGE = 'message'  # CC list copied on every email (default)
+DIGEST = 'digest'        # CC list sent digests instead
+POLICIES = (PER_MESSAGE, DIGEST)
+
+
+def digest_message(label: str, jobs: List[SendJob], final: bool) -> str:
+    """
+    Body of a digest covering some emails of a campaign
+
+    Args:
+        label: Campaign name
+        jobs: Emails covered by the digest
+        final: Last digest of the campaign
+    """
+    lines = [
+        "Bonjour,",
+        "",
+        f"Ce récapitulatif remplace la copie de chaque email de la campagne {label}.",
+        "",
+        f"Email programmé pour {len(jobs)} destinataire(s){'' if final else ' (la suite dans le prochain récapitulatif)'} :",
+    ]
+    lines += [f"- {job.name} ({', '.join(job.recipients)})" for job in jobs]
+    lines += ["", f"Exemple de l'email (destiné à {jobs[0].name}) :", "", jobs[0].message]
+    return '\n'.join(lines)
+
+
+def digest_jobs(jobs: Iterable[SendJob], cc_list: List[str], label: str,
+                every: Optional[int] = None) -> Iterator[SendJob]:
+    """
+    Pass the jobs of a campaign through, followed by a digest to the CC list
+    after every `every` jobs and after the last one
+
+    Args:
+        jobs: Emails of the campaign (sent without CC)
+        cc_list: Addresses receiving the digests
+        label: Campaign name, shown in the digests
+        every: Emails covered by each digest (None for one per campaign)
+    """
+    covered = []
+    number = 0
+
+    def digest(final: bool) -> SendJob:
+        nonlocal covered, number
+        number += 1
+        first = covered[0]
+        subject = f"Récapitulatif{'' if final and number == 1 else f' {number}'} - {first.subject}"
+        job = SendJob(f"CC digest {number}", list(cc_list), subject,
+                      digest_message(label, covered, final), first.pole, include_cc=False)
+        covered = []
+        return job
+
+    for job in jobs:
+        yield job
+        covered.append(job)
+        if every and len(covered) >= every:
+            yield digest(final=False)
+    if covered:
+        yield digest(final=True)
@@ -0,0 +1,169 @@
+"""
+Delivery Worker
+Delivers the emails queued in the outbox (OUTBOX in .env) by the send scripts,
+over pooled SMTP sessions. Several workers can drain the same outbox.
+"""
+import argparse
+import smtplib
+import threading
+from main import EmailSender, credentials_missing, load_config, load_sender_options
+from outbox import Outbox, OutboxItem
+from journal import FAILED, SENT
+from retry import is_transient
+from send_logging import logger
+
+
+class DeliveryWorker:
+    def __init__(self, sender: EmailSender, outbox: Outbox, workers: int = 1, poll_interval: float = 1.0):
+        """
+        Initialize the worker
+
+        Args:
+            sender: EmailSender providing the SMTP sessions, quotas, retry
+                policy and journal
+            outbox: Queue to drain
+            workers: Emails delivered in parallel, one SMTP session each
+            poll_interval: Seconds between checks of an empty queue
+        """
+        self.sender = sender
+        self.outbox = outbox
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.sent = 0
+        self.failed = 0
+
+    def deliver(self, item: OutboxItem):
+        """
+        Try to deliver one claimed email and record the outcome
+        """
+        sender = self.sender
+        try:
+            with sender.metrics.timer('email'):
+                refused = sender.transmit(item.data, item.recipients)
+            retry = sender.refused_to_retry(item.name, refused)
+            if retry:
+                # Only the temporarily refused recipients get the email again
+                item = item._replace(recipients=list(retry))
+                raise smtplib.SMTPRecipientsRefused(retry)
+        except Exception as e:
+            policy = sender.retry_policy
+            if policy.should_retry(e, item.attempts):
+                delay = policy.delay(item.attempts)
+                self.outbox.mark_failed(item, str(e), retry_in=delay)
+                sender.metrics.count('retries')
+                logger.warning(f"Error sending email to {item.name}: {str(e)}\n"
+                               f"⏳ Temporary failure for {item.name}, retrying in {delay:.0f}s "
+                               f"(attempt {item.attempts + 1}/{policy.max_attempts})",
+                               extra={'event': 'retry', 'recipient_name': item.name, 'recipients': item.recipients,
+                                      'error': str(e), 'attempt': item.attempts, 'campaign': item.campaign})
+                return
+            self.outbox.mark_failed(item, str(e))
+            if sender.journal is not None:
+                sender.journal.record(item.campaign, item.address, item.digest, FAILED, str(e))
+            sender.metrics.count('failed')
+            with self._lock:
+                self.failed += 1
+            logger.error(f"Error sending email to {item.name}: {str(e)}"
+                         f"{'' if is_transient(e) else ' (permanent)'}",
+                         extra={'event': 'failed', 'recipient_name': item.name, 'recipients': item.recipients,
+                                'error': str(e), 'attempt': item.attempts, 'campaign': item.campaign})
+            return
+
+        self.outbox.mark_sent(item)
+        if sender.journal is not None:
+            sender.journal.record(item.campaign, item.address, item.digest, SENT)
+        sender.metrics.count('sent')
+        with self._lock:
+            self.sent += 1
+        logger.info(f"Email sent successfully to {item.name}: {', '.join(item.recipients)}",
+                    extra={'event': 'sent', 'recipient_name': item.name, 'recipients': item.recipients,
+                           'campaign': item.campaign})
+
+    def _drain(self, stop_when_empty: bool):
+        while not self._stop.is_set():
+            item = self.outbox.claim()
+            if item is not None:
+                self.deliver(item)
+                continue
+            if stop_when_empty and not self.outbox.pending():
+                return
+            # Nothing due yet: new emails or retries will come later
+            self._stop.wait(self.poll_interval)
+
+    def stop(self):
+        """
+        Ask the worker threads to stop after their current email
+        """
+        self._stop.set()
+
+    def run(self, stop_when_empty: bool = False):
+        """
+        Deliver queued emails until stopped
+
+        Args:
+            stop_when_empty: Return once every email is delivered or given up
+                instead of waiting for new ones
+        """
+        requeued = self.outbox.requeue_stale()
+        if requeued:
+            logger.info(f"ℹ️  Put back {requeued} email(s) left unfinished by a stopped worker")
+
+        self.sender.pool.ensure_size(self.workers)
+        threads = [threading.Thread(target=self._drain, args=(stop_when_empty,), daemon=True)
+                   for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            # Join with a timeout so Ctrl+C is handled
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            print("\nStopping after the emails being sent...")
+            self.stop()
+            for thread in threads:
+                thread.join()
+
+        logger.info(f"Delivered {self.sent} email(s), {self.failed} failed")
+        logger.info(self.sender.metrics.summary())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deliver the emails queued in the outbox")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Emails delivered in parallel (defaults to SMTP_CONNECTIONS)")
+    parser.add_argument('--once', action='store_true',
+                        help="Exit when the outbox is empty instead of waiting for new emails")
+    args = parser.parse_args()
+
+    print("=== 📬 Outbox - Delivery Worker ===\n")
+
+    # Load configuration
+    smtp_server, smtp_port, sender_email, sender_password = load_config()
+
+    if credentials_missing(sender_email, sender_password):
+        print("⚠️  CONFIGURATION NEEDED:")
+        print("Please ensure your .env file contains email credentials")
+        return
+
+    options = load_sender_options()
+    outbox = options.get('outbox')
+    if outbox is None:
+        print("⚠️  CONFIGURATION NEEDED:")
+        print("Please set OUTBOX=outbox.db in your .env file")
+        return
+
+    print(f"📧 Using email: {sender_email}")
+    print(f"🌐 SMTP server: {smtp_server}:{smtp_port}")
+    print(f"📥 Outbox: {outbox.path} ({outbox.pending()} email(s) pending)")
+
+    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password, **options)
+    try:
+        DeliveryWorker(email_sender, outbox, args.workers or email_sender.pool.size).run(stop_when_empty=args.once)
+    finally:
+        email_sender.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Keyword highlighter
+Wraps important words of a paragraph in <span class="highlight"> using one
+combined regular expression, compiled once per keyword list.
+"""
+import re
+from typing import Iterable, List
+
+HIGHLIGHT_OPEN = '<span class="highlight">'
+HIGHLIGHT_CLOSE = '</span>'
+
+
+def highlight_sequential(text: str, words: List[str]) -> str:
+    """
+    Highlight words one after the other, as convert_to_html originally did
+
+    Every word is searched case-insensitively over the whole text, including
+    the markup added for previous (longer) words.
+
+    Args:
+        text: Paragraph to highlight
+        words: Keywords, longest first
+
+    Returns:
+        Paragraph with highlighted keywords
+    """
+    for word in words:
+        if word.lower() in text.lower():
+            # Use case-insensitive replacement
+            pattern = re.compile(re.escape(word), re.IGNORECASE)
+            text = pattern.sub(f'{HIGHLIGHT_OPEN}{word}{HIGHLIGHT_CLOSE}', text)
+    return text
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """
+    Build a regular expression matching any of the words, with common
+    prefixes factored out so each position of the text is tested once
+
+    At every position the longest word wins, like a longest-first alternation.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node) -> str:
+        ends_here = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if ends_here:
+            body = body + '?' if len(branches) == 1 and len(body) == 1 else '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class KeywordHighlighter:
+    def __init__(self, words: Iterable[str]):
+        """
+        Compile a keyword list into a single-pass highlighter
+
+        Args:
+            words: Keywords to highlight (matched case-insensitively,
+                replaced by their canonical spelling)
+        """
+        # Sort by length (longest first) to avoid partial replacements
+        self.words = sorted((word for word in words if word), key=len, reverse=True)
+        self.pattern = None
+        self.overlaps = None
+        self.replacements = {}
+
+        if self.words and self._supports_single_pass():
+            # Texts are lowercased before matching, which makes the search
+            # case-insensitive without the cost of re.IGNORECASE
+            self.pattern = re.compile(_trie_pattern([word.lower() for word in self.words]))
+            # Shorter keywords inside a longer one were highlighted again by the
+            # word-by-word substitution, so the nested markup is precomputed
+            for index, word in enumerate(self.words):
+                self.replacements.setdefault(
+                    word.lower(),
+                    f'{HIGHLIGHT_OPEN}{highlight_sequential(word, self.words[index + 1:])}{HIGHLIGHT_CLOSE}'
+                )
+            overlaps = self._overlapping_spellings()
+            if overlaps:
+                self.overlaps = re.compile(_trie_pattern(overlaps))
+
+    def _supports_single_pass(self) -> bool:
+        """
+        Check that no keyword can match inside the added markup, in which case
+        only the word-by-word substitution gives the expected result
+        """
+        markup = f'{HIGHLIGHT_OPEN}{HIGHLIGHT_CLOSE}'.lower()
+        for word in self.words:
+            if word.lower() in markup or any(char in word for char in '<>"=\\'):
+                return False
+        return True
+
+    def _overlapping_spellings(self) -> List[str]:
+        """
+        List the texts where two keywords partially overlap (end of one =
+        start of the other)
+
+        A leftmost scan and the longest-first substitution can disagree only
+        on such texts, so paragraphs containing one are highlighted word by word.
+        """
+        lowered = [word.lower() for word in self.words]
+        overlaps = []
+        for first in lowered:
+            for second in lowered:
+                for size in range(1, min(len(first), len(second))):
+                    if first[-size:] == second[:size]:
+                        overlaps.append(first + second[size:])
+        return overlaps
+
+    def highlight(self, text: str) -> str:
+        """
+        Highlight every keyword of a paragraph
+
+        Args:
+            text: Paragraph to highlight
+
+        Returns:
+            Paragraph with keywords wrapped in <span class="highlight">
+        """
+        if self.pattern is None:
+            return highlight_sequential(text, self.words)
+
+        lowered = text.lower()
+        if len(lowered) != len(text) or (self.overlaps is not None and self.overlaps.search(lowered)):
+            return highlight_sequential(text, self.words)
+
+        parts = []
+        position = 0
+        for match in self.pattern.finditer(lowered):
+            parts.append(text[position:match.start()])
+            parts.append(self.replacements[match.group()])
+            position = match.end()
+        if not parts:
+            return text
+        parts.append(text[position:])
+        return ''.join(parts)
@@ -0,0 +1,142 @@
+"""
+Send journal
+Durable record of every email sent per campaign, stored in SQLite, so an
+interrupted campaign can be re-run without mailing the same people twice.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+SENT = 'sent'
+FAILED = 'failed'
+
+
+def content_hash(subject: str, message: str, pole: str = "") -> str:
+    """
+    Short fingerprint of an email's content
+
+    Args:
+        subject: Email subject
+        message: Personalized plain text body
+        pole: Pole name used for styling
+
+    Returns:
+        Hex digest identifying the content
+    """
+    return hashlib.sha256(f"{subject}\0{pole}\0{message}".encode('utf-8')).hexdigest()[:32]
+
+
+def recipient_key(recipients: List[str]) -> str:
+    """
+    Journal key of an email's recipients
+    """
+    return ','.join(address.lower() for address in recipients)
+
+
+class SendJournal:
+    def __init__(self, path: str):
+        """
+        Open (or create) a journal file
+
+        Every write is committed with synchronous=FULL, so a recorded send
+        survives a crash or power loss right after it.
+
+        Args:
+            path: Path to the SQLite journal file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS sends (
+                campaign TEXT NOT NULL,
+                address TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (campaign, address, content_hash)
+            )
+        """)
+        # Delivered (address, content hash) pairs per loaded campaign
+        self._delivered: Dict[str, Set[Tuple[str, str]]] = {}
+
+    def _delivered_for(self, campaign: str) -> Set[Tuple[str, str]]:
+        delivered = self._delivered.get(campaign)
+        if delivered is None:
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT address, content_hash FROM sends WHERE campaign = ? AND status = ?",
+                    (campaign, SENT)
+                ).fetchall()
+            delivered = {(address, digest) for address, digest in rows}
+            self._delivered[campaign] = delivered
+        return delivered
+
+    def delivered_count(self, campaign: str) -> int:
+        """
+        Number of emails already delivered for a campaign
+        """
+        return len(self._delivered_for(campaign))
+
+    def is_delivered(self, campaign: str, address: str, digest: str) -> bool:
+        """
+        Check whether an email was already delivered (in-memory set lookup)
+
+        Args:
+            campaign: Campaign identifier
+            address: Recipient key (see recipient_key)
+            digest: Content hash (see content_hash)
+        """
+        return (address, digest) in self._delivered_for(campaign)
+
+    def record(self, campaign: str, address: str, digest: str, status: str, error: Optional[str] = None):
+        """
+        Durably record the outcome of a send
+
+        Args:
+            campaign: Campaign identifier
+            address: Recipient key (see recipient_key)
+            digest: Content hash (see content_hash)
+            status: SENT or FAILED
+            error: Error message of a failed send
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sends (campaign, address, content_hash, status, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (campaign, address, digest, status, error, time.time())
+            )
+        if status == SENT:
+            self._delivered_for(campaign).add((address, digest))
+
+    def sent_times(self, since: float) -> List[float]:
+        """
+        Times of the emails delivered since a given time, oldest first, for
+        every campaign (to seed the sending quotas, see RateLimiter.seed)
+
+        Args:
+            since: Wall-clock time (time.time()) to start from
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT updated_at FROM sends WHERE status = ? AND updated_at > ? ORDER BY updated_at",
+                (SENT, since)
+            ).fetchall()
+        return [updated_at for updated_at, in rows]
+
+    def reset(self, campaign: str):
+        """
+        Forget every send of a campaign, so it can be sent again from scratch
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM sends WHERE campaign = ?", (campaign,))
+        self._delivered.pop(campaign, None)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
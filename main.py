@@ -1,15 +1,329 @@
+import argparse
+import binascii
 import csv
 import smtplib
+from concurrent.futures import ProcessPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
 from email.header import Header
+from email.message import Message
+from email.generator import BytesGenerator
+from collections import OrderedDict, deque
+import hashlib
+import io
+import itertools
 import os
-from typing import List, Tuple, Optional
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Union
 from dotenv import load_dotenv
+from smtp_pool import SMTPConnectionPool
+from send_engine import CampaignResult, SendEngine, SendJob, SendResult
+from highlighter import KeywordHighlighter
+from rate_limit import RateLimiter
+from retry import RetryPolicy, is_transient
+from journal import FAILED, SENT, SendJournal, content_hash, recipient_key
+from outbox import Outbox
+from preview import EmlWriter, MboxWriter, open_preview
+from metrics import Metrics
+from recipients import Recipient, RecipientSet, normalize_address
+from validation import AddressValidator, RejectReport
+from manifest import BULK, PERSONAL, Campaign
+from planning import CampaignPlan
+from cc_digest import DIGEST, PER_MESSAGE, POLICIES as CC_POLICIES, digest_jobs
+from transports import AUTHENTICATED, DEFAULT_SERVERS, STARTTLS, SMTPTransport, accepts_8bit, open_transport
+from send_logging import ensure_logging, flush_logging, logger
+
+# Words highlighted in regular paragraphs, unless a pole has its own list
+WELCOME_HIGHLIGHTS = ['Junior Entreprise', 'Sésame Junior Entreprise', 'Sesame Junior Entreprise', 
+                      'motivation', 'créativité', 'dynamique', 'ambitieux', 'professionnel', 'professionnellement']
+ANNOUNCEMENT_HIGHLIGHTS = ['Sésame Junior Entreprise', 'Sesame Junior Entreprise', 
+                           'Assemblée Générale', 'CTJE', 'Confédération Tunisienne des Junior Entreprises',
+                           'obligatoire', 'strictement', 'tenue formelle', 'Pôle Projet']
+
+# Bcc recipients per email when campaigns are coalesced without a batch size
+COALESCE_BATCH_SIZE = 50
+
+HTML_TAIL = """
+                    <div class="signature">
+                        <img src="cid:signature" alt="Signature" style="max-width: 100%; height: auto;">
+                    </div>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+
+class CompiledTemplate:
+    def __init__(self, sender: 'EmailSender', template: str, pole: str):
+        """
+        Split a template into pre-rendered HTML and per-recipient paragraphs
+        
+        Args:
+            sender: EmailSender providing the HTML rendering rules
+            template: Email template containing the [X] placeholder
+            pole: Pole name for styling
+        """
+        self.sender = sender
+        self.template = template
+        self.pole = pole
+        
+        # Each fragment is either ready HTML (str) or a (position, paragraph)
+        # pair still containing [X]
+        self.fragments = []
+        static = [sender._html_head(pole)]
+        for i, paragraph in enumerate(template.strip().split('\n\n')):
+            if '[X]' in paragraph:
+                self.fragments.append(''.join(static))
+                self.fragments.append((i, paragraph))
+                static = []
+            else:
+                static.append(sender._render_paragraph(i, paragraph, pole))
+        static.append(HTML_TAIL)
+        self.fragments.append(''.join(static))
+    
+    def render(self, name: str) -> str:
+        """
+        Render the HTML message for one recipient
+        
+        Args:
+            name: Name replacing [X]
+            
+        Returns:
+            Same HTML as convert_to_html(personalize_message(template, name), pole)
+        """
+        # Names that could change how the text is split into paragraphs
+        # go through the full conversion
+        if not name or '\n' in name or name != name.strip():
+            return self.sender.convert_to_html(self.sender.personalize_message(self.template, name), self.pole)
+        
+        parts = []
+        for fragment in self.fragments:
+            if isinstance(fragment, str):
+                parts.append(fragment)
+            else:
+                i, paragraph = fragment
+                parts.append(self.sender._render_paragraph(i, paragraph.replace('[X]', name), self.pole))
+        return ''.join(parts)
+
+
+def _flatten(msg: Message) -> bytes:
+    """
+    Serialize a message the way smtplib.send_message does (CRLF line endings)
+    """
+    buffer = io.BytesIO()
+    BytesGenerator(buffer).flatten(msg, linesep='\r\n')
+    return buffer.getvalue()
+
+
+# MIME boundaries in the format of email.generator
+_BOUNDARY_FORMAT = '=' * 15 + '%%0%dd' % len(repr(sys.maxsize - 1)) + '=='
+# Headers holding only email addresses
+_ADDRESS_HEADERS = ('From', 'To', 'Cc')
+# Longest line of an unencoded part (RFC 5322), CRLF excluded
+_MAX_LINE_LENGTH = 998
+
+def _text_part(text: str, subtype: str, eight_bit: bool = False) -> bytes:
+    """
+    Serialize a MIMEText(text, subtype, 'utf-8') part exactly as _flatten does
+    
+    With eight_bit, the UTF-8 text is sent as is (8bit, or 7bit when it is
+    ASCII) instead of base64, unless a line is too long for SMTP.
+    """
+    if eight_bit:
+        data = text.replace('\r\n', '\n').replace('\r', '\n').encode('utf-8')
+        if all(len(line) <= _MAX_LINE_LENGTH for line in data.split(b'\n')):
+            encoding = b'7bit' if data.isascii() else b'8bit'
+            return (b'Content-Type: text/' + subtype.encode('ascii') + b'; charset="utf-8"\r\n'
+                    b'MIME-Version: 1.0\r\nContent-Transfer-Encoding: ' + encoding + b'\r\n\r\n'
+                    + data.replace(b'\n', b'\r\n'))
+    encoded = binascii.b2a_base64(text.encode('utf-8'), newline=False)
+    # 76 characters per line, like base64.encodebytes
+    payload = b''.join(encoded[i:i + 76] + b'\r\n' for i in range(0, len(encoded), 76))
+    return (b'Content-Type: text/' + subtype.encode('ascii') + b'; charset="utf-8"\r\n'
+            b'MIME-Version: 1.0\r\nContent-Transfer-Encoding: base64\r\n\r\n' + payload)
+
+def _header_line(name: str, value) -> bytes:
+    """
+    Serialize one header exactly as _flatten does
+    
+    Short ASCII values are written as is; encoded or folded headers go
+    through the email package. Addresses with non-ASCII characters are
+    written as UTF-8 (RFC 6532), since they are only sent with SMTPUTF8,
+    folded between addresses like the email package folds ASCII lists.
+    """
+    if name in _ADDRESS_HEADERS and isinstance(value, str) and not value.isascii():
+        addresses = value.split(', ')
+        lines = [f"{name}: {addresses[0]}"]
+        for address in addresses[1:]:
+            if len(lines[-1]) + len(address) + 2 > 78:
+                lines[-1] += ','
+                lines.append(f" {address}")
+            else:
+                lines[-1] += f", {address}"
+        return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+    if isinstance(value, str) and value.isascii() and len(name) + len(value) <= 76 \
+            and '\r' not in value and '\n' not in value:
+        return f"{name}: {value}\r\n".encode('ascii')
+    headers = Message()
+    headers[name] = value
+    return _flatten(headers)[:-2]
+
+def _multipart(subtype: str, parts: List[bytes]) -> Tuple[bytes, bytes]:
+    """
+    Serialize a multipart container of serialized parts exactly as _flatten does
+    
+    Returns:
+        Tuple (headers, body) of the container
+    """
+    boundary = (_BOUNDARY_FORMAT % random.randrange(sys.maxsize)).encode('ascii')
+    # Only unencoded (8bit) text parts could contain the boundary
+    while any(boundary in part for part in parts):
+        boundary = (_BOUNDARY_FORMAT % random.randrange(sys.maxsize)).encode('ascii')
+    content_type = b'Content-Type: multipart/' + subtype.encode('ascii') + b';'
+    # Fold the header like the email package when it exceeds 78 characters
+    separator = b' ' if len(content_type) + len(boundary) + 12 <= 78 else b'\r\n '
+    headers = content_type + separator + b'boundary="' + boundary + b'"\r\nMIME-Version: 1.0\r\n'
+    delimiter = b'--' + boundary
+    body = delimiter + b'\r\n' + (b'\r\n' + delimiter + b'\r\n').join(parts) + b'\r\n' + delimiter + b'--\r\n'
+    return headers, body
+
+
+class SeenAddresses:
+    def __init__(self):
+        """
+        Compact set of email addresses for deduplication
+        
+        Stores a 64-bit digest per address instead of the string, so memory per
+        entry stays small and constant whatever the address length. Addresses
+        are compared without case.
+        """
+        self._digests = set()
+    
+    def add(self, address: str) -> bool:
+        """
+        Record an address
+        
+        Returns:
+            True if the address was not seen before
+        """
+        digest = int.from_bytes(hashlib.blake2b(normalize_address(address).encode('utf-8'), digest_size=8).digest(), 'big')
+        if digest in self._digests:
+            return False
+        self._digests.add(digest)
+        return True
+    
+    def __len__(self) -> int:
+        return len(self._digests)
+
+
+class MessageCache:
+    def __init__(self, max_entries: int = 64):
+        """
+        Least recently used cache of rendered email bodies
+        
+        Args:
+            max_entries: Number of distinct bodies kept
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class InlineImageCache:
+    def __init__(self):
+        """
+        Cache of inline images (e.g. the signature) shared by all messages
+        
+        Each file is read and base64-encoded once, and reloaded only when
+        its modification time or size changes.
+        """
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def get(self, path: str, content_id: str) -> Optional[MIMEImage]:
+        """
+        Get the MIME part of an inline image
+        
+        Args:
+            path: Path to the image file
+            content_id: Content-ID referenced from the HTML (cid:...)
+            
+        Returns:
+            MIMEImage ready to attach, or None if the file does not exist
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+        
+        key = (path, content_id)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        
+        with self._lock:
+            with open(path, 'rb') as f:
+                img_data = f.read()
+            image = MIMEImage(img_data)
+            image.add_header('Content-ID', f'<{content_id}>')
+            image.add_header('Content-Disposition', 'inline', filename=os.path.basename(path))
+            self._entries[key] = (version, image, _flatten(image))
+        return image
+    
+    def get_serialized(self, path: str, content_id: str) -> Optional[Tuple[MIMEImage, bytes]]:
+        """
+        Get an inline image with its serialized MIME part
+        
+        Returns:
+            Tuple (MIMEImage, part bytes with CRLF line endings), or None if
+            the file does not exist
+        """
+        image = self.get(path, content_id)
+        if image is None:
+            return None
+        entry = self._entries[(path, content_id)]
+        return image, entry[2]
+
 
 class EmailSender:
-    def __init__(self, smtp_server: str, smtp_port: int, email: str, password: str):
+    def __init__(self, smtp_server: str, smtp_port: int, email: str, password: str,
+                 pool_size: int = 1, max_messages_per_connection: int = 100,
+                 idle_timeout: float = 60.0, highlight_keywords: Optional[Dict[str, List[str]]] = None,
+                 bulk_batch_size: Optional[int] = None, rate_limiter: Optional[RateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None, journal: Optional[SendJournal] = None,
+                 outbox: Optional[Outbox] = None, render_processes: int = 1,
+                 cc_list: Optional[List[str]] = None, preview: Optional[Union[EmlWriter, MboxWriter]] = None,
+                 metrics: Optional[Metrics] = None, metrics_file: Optional[str] = None,
+                 validator: Optional[AddressValidator] = None, reject_report: Optional[RejectReport] = None,
+                 cc_policy: str = PER_MESSAGE, cc_digest_every: Optional[int] = None,
+                 transport=None, eight_bit: Optional[bool] = None):
         """
         Initialize the email sender with SMTP configuration
         
@@ -18,12 +332,122 @@ class EmailSender:
             smtp_port: SMTP port (e.g., 587 for TLS)
             email: Sender email address
             password: Sender email password or app password
+            pool_size: Number of SMTP sessions kept open for the campaign
+            max_messages_per_connection: Messages sent before a session is reopened
+            idle_timeout: Seconds after which an idle session is reopened
+            highlight_keywords: Words to highlight per pole name (poles not listed
+                use ANNOUNCEMENT_HIGHLIGHTS or WELCOME_HIGHLIGHTS)
+            bulk_batch_size: Recipients per envelope for bulk emails (None sends
+                a single email to everyone)
+            rate_limiter: Quotas every email waits for before being sent
+            retry_policy: Backoff for transient SMTP failures (defaults to
+                4 attempts starting at 5 seconds)
+            journal: Durable record of sent emails; campaigns skip the
+                recipients it already lists as sent (None disables resuming)
+            outbox: Queue campaigns are rendered into for delivery_worker.py
+                instead of being sent (None sends directly)
+            render_processes: Processes rendering personalized emails in
+                parallel with the sending (1 renders in this process)
+            cc_list: CC addresses (defaults to the content of cc.csv)
+            preview: Writer receiving the rendered emails instead of the SMTP
+                server (see preview.open_preview); nothing is sent or journaled
+            metrics: Timers and counters of the sends (a new Metrics by default)
+            metrics_file: File the metrics are exported to on close (.jsonl
+                for JSON lines, Prometheus text format otherwise)
+            validator: Checks the CSV addresses before sending; rejected
+                addresses are never sent to (None sends to every address)
+            reject_report: CSV report the rejected addresses are written to
+            cc_policy: How the CC list follows personalized campaigns:
+                'message' copies it on every email, 'digest' sends it digests
+                of the campaign instead (see cc_digest)
+            cc_digest_every: Emails per digest (None for one per campaign)
+            transport: How emails are handed over (see transports); defaults
+                to the SMTP server above with STARTTLS and login
+            eight_bit: Send the text parts as UTF-8 instead of base64, which
+                needs a server advertising 8BITMIME (None asks the server on
+                the first email; emails previewed or queued in the outbox stay
+                base64)
         """
+        if cc_policy not in CC_POLICIES:
+            raise ValueError(f"Unknown CC policy {cc_policy!r} (expected {' or '.join(CC_POLICIES)})")
+        ensure_logging()
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.email = email
         self.password = password
-        self.cc_list = self.load_cc_list()
+        self.cc_list = self.load_cc_list() if cc_list is None else cc_list
+        self.highlight_keywords = highlight_keywords or {}
+        self._highlighters = {}
+        self._html_heads = {}
+        # Inline images attached to every email, by Content-ID
+        self.inline_images = {'signature': 'signature.png'}
+        self.image_cache = InlineImageCache()
+        self.message_cache = MessageCache()
+        self.bulk_batch_size = bulk_batch_size
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.journal = journal
+        if rate_limiter and journal is not None:
+            # Emails sent by earlier runs still count against the hourly and daily quotas
+            rate_limiter.seed(journal.sent_times(time.time() - rate_limiter.window))
+        self.outbox = outbox
+        self.render_processes = render_processes
+        self.preview = preview
+        self.metrics = metrics or Metrics()
+        self.metrics_file = metrics_file
+        self.validator = validator
+        self.reject_report = reject_report
+        self.cc_policy = cc_policy
+        self.cc_digest_every = cc_digest_every
+        self.transport = transport or SMTPTransport(smtp_server, smtp_port, email, password)
+        self.eight_bit = eight_bit
+        if transport is not None and type(transport) is not SMTPTransport:
+            logger.info(f"📮 Emails handed to {transport}")
+        self._compiled_templates = {}
+        self._encoded_headers = {}
+        self.pool = SMTPConnectionPool(
+            self._open_connection,
+            size=pool_size,
+            max_messages_per_connection=max_messages_per_connection,
+            idle_timeout=idle_timeout
+        )
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """
+        Close the SMTP sessions kept open by the connection pool, the journal,
+        the outbox, the preview output and the reject report, export the
+        metrics and write the pending log messages
+        """
+        self.pool.close()
+        if self.metrics_file:
+            self.metrics.export(self.metrics_file)
+            logger.info(f"📊 Metrics written to {self.metrics_file}")
+        if self.journal is not None:
+            self.journal.close()
+        if self.outbox is not None:
+            self.outbox.close()
+        if self.preview is not None:
+            self.preview.close()
+        if self.reject_report is not None:
+            self.reject_report.close()
+        flush_logging()
+    
+    def _open_connection(self) -> smtplib.SMTP:
+        """
+        Open a session of the transport (an authenticated SMTP session by default)
+        
+        Returns:
+            Connected SMTP session ready to send
+        """
+        server = self.transport.connect(self.metrics)
+        self.metrics.count('connections')
+        return server
     
     def load_cc_list(self) -> List[str]:
         """
@@ -36,7 +460,7 @@ class EmailSender:
         cc_file = "cc.csv"
         
         if not os.path.exists(cc_file):
-            print(f"ℹ️  CC file {cc_file} not found, no carbon copies will be sent")
+            logger.info(f"ℹ️  CC file {cc_file} not found, no carbon copies will be sent")
             return cc_emails
         
         try:
@@ -49,41 +473,83 @@ class EmailSender:
                         cc_emails.append(email)
             
             if cc_emails:
-                print(f"📋 Loaded {len(cc_emails)} CC addresses from {cc_file}")
+                logger.info(f"📋 Loaded {len(cc_emails)} CC addresses from {cc_file}")
             
         except Exception as e:
-            print(f"⚠️  Error reading {cc_file}: {str(e)}")
+            logger.warning(f"⚠️  Error reading {cc_file}: {str(e)}")
         
         return cc_emails
     
-    def read_csv_emails(self, csv_file: str) -> List[Tuple[str, str, Optional[str]]]:
+    def iter_csv_emails(self, csv_file: str, dedup: bool = False) -> Iterator[Recipient]:
         """
-        Read emails from CSV file
+        Read emails from CSV file lazily, one row at a time
         
         Args:
             csv_file: Path to CSV file
+            dedup: Skip rows whose mailSesame was already seen (in any case)
             
-        Returns:
-            List of tuples (name, mailSesame, mailAutre)
+        Yields:
+            Recipient records, unpacking as (name, mailSesame, mailAutre)
         """
-        emails = []
+        seen = SeenAddresses() if dedup else None
         try:
-            with open(csv_file, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
+            with open(csv_file, 'r', encoding='utf-8', newline='') as file:
+                reader = csv.reader(file)
+                header = next(reader, [])
+                # Column positions (None if the column is missing)
+                name_column, sesame_column, autre_column = [header.index(column) if column in header else None
+                                                            for column in ('name', 'mailSesame', 'mailAutre')]
+                width = max([column + 1 for column in (name_column, sesame_column, autre_column) if column is not None],
+                            default=0)
                 for row in reader:
-                    # Handle None values safely
-                    name = (row.get('name') or '').strip()
-                    mail_sesame = (row.get('mailSesame') or '').strip()
-                    mail_autre = (row.get('mailAutre') or '').strip()
+                    # Handle missing columns and short rows safely
+                    if len(row) < width:
+                        row += [''] * (width - len(row))
+                    name = row[name_column].strip() if name_column is not None else ''
+                    mail_sesame = row[sesame_column].strip() if sesame_column is not None else ''
+                    mail_autre = row[autre_column].strip() if autre_column is not None else ''
                     
-                    if name and mail_sesame:  # Only add if both name and mailSesame exist
-                        emails.append((name, mail_sesame, mail_autre if mail_autre else None))
+                    if not (name and mail_sesame):  # Only yield if both name and mailSesame exist
+                        continue
+                    if seen is not None and not seen.add(mail_sesame):
+                        logger.info(f"ℹ️  Skipping duplicate row for {name} ({mail_sesame})")
+                        continue
+                    if mail_autre and normalize_address(mail_autre) == normalize_address(mail_sesame):
+                        mail_autre = ''
+                    yield Recipient(name, mail_sesame, mail_autre or None)
         except FileNotFoundError:
-            print(f"Error: File {csv_file} not found")
+            logger.error(f"Error: File {csv_file} not found")
         except Exception as e:
-            print(f"Error reading {csv_file}: {str(e)}")
+            logger.error(f"Error reading {csv_file}: {str(e)}")
+    
+    def read_csv_emails(self, csv_file: str, validate: bool = False, merge: bool = False) -> RecipientSet:
+        """
+        Read emails from CSV file, one record per mailSesame (in any case)
         
-        return emails
+        Args:
+            csv_file: Path to CSV file
+            validate: Drop the addresses rejected by the validator
+            merge: Keep the other addresses of the rows repeating a mailSesame
+                   for the bulk emails, like send_bulk_email does
+            
+        Returns:
+            RecipientSet in CSV order, iterating like a list of
+            (name, mailSesame, mailAutre) tuples
+        """
+        rows = self.iter_csv_emails(csv_file)
+        if validate:
+            rows = self._validated(rows, csv_file)
+        recipients = RecipientSet()
+        for recipient in rows:
+            if recipients.add(recipient):
+                continue
+            merged = recipients.merge(recipient) if merge else []
+            if merged:
+                logger.info(f"ℹ️  Merging duplicate row for {recipient.name} ({recipient.mail_sesame}): "
+                            f"{', '.join(merged)} added to the bulk emails")
+            else:
+                logger.info(f"ℹ️  Skipping duplicate row for {recipient.name} ({recipient.mail_sesame})")
+        return recipients
     
     def read_template(self, template_file: str) -> str:
         """
@@ -99,10 +565,10 @@ class EmailSender:
             with open(template_file, 'r', encoding='utf-8') as file:
                 return file.read()
         except FileNotFoundError:
-            print(f"Error: Template file {template_file} not found")
+            logger.error(f"Error: Template file {template_file} not found")
             return ""
         except Exception as e:
-            print(f"Error reading template {template_file}: {str(e)}")
+            logger.error(f"Error reading template {template_file}: {str(e)}")
             return ""
     
     def personalize_message(self, template: str, name: str) -> str:
@@ -118,25 +584,25 @@ class EmailSender:
         """
         return template.replace('[X]', name)
     
-    def convert_to_html(self, text: str, pole: str) -> str:
+    def _html_head(self, pole: str) -> str:
         """
-        Convert plain text template to HTML with styling
+        Build the HTML document start (styles and header) for a pole
+        
+        The result only depends on the pole, so it is built once per pole.
         
         Args:
-            text: Plain text template
             pole: Pole name for color theming
             
         Returns:
-            HTML formatted message
+            HTML up to the message content
         """
+        if pole in self._html_heads:
+            return self._html_heads[pole]
+        
         # Use the requested colors for both poles
         primary_color = "#007cc1"  # Blue
         secondary_color = "#12c2d2"  # Light blue/cyan
         
-        # Determine if this is a convocation/meeting email
-        is_convocation = "Convocation" in pole or "AG" in pole
-        is_meeting = "Réunion" in pole or "Meeting" in pole
-        
         # Convert to HTML with styling
         html = f"""
         <!DOCTYPE html>
@@ -304,345 +770,1288 @@ class EmailSender:
                     </div>
         """
         
-        # Split text into paragraphs and format them
-        paragraphs = text.strip().split('\n\n')
-        
-        for i, paragraph in enumerate(paragraphs):
-            # Skip empty paragraphs
-            if not paragraph.strip():
-                continue
-                
-            # Check for greeting
-            if i == 0 and ("Chers" in paragraph or "Bonsoir" in paragraph):
-                html += f'<div class="greeting">{paragraph}</div>\n'
-            # Meeting info detection (check for Date/Heure/Lien keywords or meeting links)
-            elif is_meeting and (any(keyword in paragraph for keyword in ["Date :", "Heure :", "Lien de la réunion"]) or "https://" in paragraph or "meet.google.com" in paragraph):
-                # Check if paragraph contains meeting link
-                if "https://" in paragraph or "meet.google.com" in paragraph:
-                    # Split into lines and format each
-                    lines = paragraph.split('\n')
-                    html += '<div class="meeting-info">\n'
-                    for line in lines:
-                        if "https://" in line or "meet.google.com" in line:
-                            # Extract the link
-                            import re
-                            link_match = re.search(r'https://[^\s]+', line)
-                            if link_match:
-                                link = link_match.group(0)
-                                html += f'<div class="meeting-link"><a href="{link}" target="_blank">Rejoindre la réunion</a></div>\n'
-                            else:
-                                html += f'<div style="margin: 8px 0; font-size: 17px;">{line}</div>\n'
-                        else:
-                            html += f'<div style="margin: 8px 0; font-size: 17px;">{line}</div>\n'
-                    html += '</div>\n'
-                else:
-                    html += f'<div class="meeting-info">{paragraph.replace(chr(10), "<br>")}</div>\n'
-            # Check for special event header (AG invitation)
-            elif "cordialement conviés" in paragraph.lower():
-                html += f'<div class="event-header">{paragraph}</div>\n'
-            # Check for congratulations/important announcements
-            elif "félicitons" in paragraph.lower() or "accueillons" in paragraph.lower():
-                html += f'<div class="congratulations">{paragraph}</div>\n'
-            # Check for program/schedule sections with enhanced formatting
-            elif any(keyword in paragraph for keyword in ["Programme de la journée", "Ordre du jour"]):
-                # Split into lines and format as agenda items
-                lines = paragraph.split('\n')
-                html += f'<div class="program"><strong style="color: {primary_color}; font-size: 18px;">{lines[0]}</strong><br><br>\n'
-                for line in lines[1:]:
-                    if line.strip() and not line.startswith(('Programme', 'Ordre')):
-                        html += f'<div class="agenda-item">{line}</div>\n'
-                html += '</div>\n'
-            # Check for important information sections
-            elif any(keyword in paragraph for keyword in ["Informations importantes", "IMPORTANT", "obligatoire", "strictement"]):
-                html += f'<div class="important">{paragraph.replace(chr(10), "<br>")}</div>\n'
-            # Check for closing/motivational message
-            elif any(keyword in paragraph.lower() for keyword in ["journée inaugurale marque", "au plaisir de", "À tout à l'heure", "exceptionnelle"]) and len(paragraph) > 50:
-                html += f'<div class="closing-message">{paragraph}</div>\n'
-            else:
-                # Add highlights to important words
-                styled_paragraph = paragraph
-                
-                if is_convocation or is_meeting:
-                    important_words = ['Sésame Junior Entreprise', 'Sesame Junior Entreprise', 
-                                     'Assemblée Générale', 'CTJE', 'Confédération Tunisienne des Junior Entreprises',
-                                     'obligatoire', 'strictement', 'tenue formelle', 'Pôle Projet']
-                else:
-                    important_words = ['Junior Entreprise', 'Sésame Junior Entreprise', 'Sesame Junior Entreprise', 
-                                     'motivation', 'créativité', 'dynamique', 'ambitieux', 'professionnel', 'professionnellement']
-                
-                # Sort by length (longest first) to avoid partial replacements
-                important_words.sort(key=len, reverse=True)
-                
-                for word in important_words:
-                    if word.lower() in styled_paragraph.lower():
-                        # Use case-insensitive replacement
-                        import re
-                        pattern = re.compile(re.escape(word), re.IGNORECASE)
-                        styled_paragraph = pattern.sub(f'<span class="highlight">{word}</span>', styled_paragraph)
-                
-                # Replace line breaks within paragraphs with <br>
-                styled_paragraph = styled_paragraph.replace('\n', '<br>')
-                
-                html += f'<div class="content">{styled_paragraph}</div>\n'
-        
-        html += """
-                    <div class="signature">
-                        <img src="cid:signature" alt="Signature" style="max-width: 100%; height: auto;">
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
+        self._html_heads[pole] = html
         return html
     
-    def send_email(self, recipients: List[str], subject: str, message: str, pole: str = "", recipient_name: str = "") -> bool:
+    def highlighter_for_pole(self, pole: str) -> KeywordHighlighter:
         """
-        Send HTML email to recipients with signature and CC
+        Get the keyword highlighter of a pole
         
         Args:
-            recipients: List of email addresses
-            subject: Email subject
-            message: Email body (plain text)
-            pole: Pole name for styling
-            recipient_name: Name of the recipient for unique message ID
+            pole: Pole name
             
         Returns:
-            True if successful, False otherwise
+            KeywordHighlighter compiled once per keyword list
         """
-        try:
-            # Create message
-            msg = MIMEMultipart('related')
-            msg['From'] = self.email
-            msg['To'] = ', '.join(recipients)
-            
-            # Add CC if available
-            if self.cc_list:
-                msg['Cc'] = ', '.join(self.cc_list)
-                # Add CC addresses to the actual recipient list for sending
-                all_recipients = recipients + self.cc_list
+        words = self.highlight_keywords.get(pole)
+        if words is None:
+            # Convocation/meeting emails highlight announcement words
+            if "Convocation" in pole or "AG" in pole or "Réunion" in pole or "Meeting" in pole:
+                words = ANNOUNCEMENT_HIGHLIGHTS
             else:
-                all_recipients = recipients
-            
-            msg['Subject'] = Header(subject, 'utf-8')
-            
-            # Add unique headers to prevent threading
-            import time
-            import uuid
-            unique_id = f"{int(time.time())}.{uuid.uuid4().hex[:8]}"
-            msg['Message-ID'] = f"<welcome.{recipient_name.replace(' ', '.')}.{unique_id}@sesame.com.tn>"
-            msg['Date'] = time.strftime('%a, %d %b %Y %H:%M:%S %z')
-            
-            # Prevent threading by ensuring no References or In-Reply-To headers
-            if 'References' in msg:
-                del msg['References']
-            if 'In-Reply-To' in msg:
-                del msg['In-Reply-To']
-            
-            # Create multipart alternative for both HTML and plain text
-            msg_alternative = MIMEMultipart('alternative')
-            msg.attach(msg_alternative)
-            
-            # Add plain text version
-            text_part = MIMEText(message, 'plain', 'utf-8')
-            msg_alternative.attach(text_part)
+                words = WELCOME_HIGHLIGHTS
+        
+        key = tuple(words)
+        if key not in self._highlighters:
+            self._highlighters[key] = KeywordHighlighter(words)
+        return self._highlighters[key]
+    
+    def _render_paragraph(self, i: int, paragraph: str, pole: str) -> str:
+        """
+        Convert one paragraph of a plain text template to styled HTML
+        
+        Args:
+            i: Position of the paragraph in the message
+            paragraph: Paragraph text
+            pole: Pole name for styling rules
             
-            # Convert to HTML and add HTML version
-            html_message = self.convert_to_html(message, pole)
-            html_part = MIMEText(html_message, 'html', 'utf-8')
-            msg_alternative.attach(html_part)
-            
-            # Add signature image
-            signature_path = "signature.png"
-            if os.path.exists(signature_path):
-                with open(signature_path, 'rb') as f:
-                    img_data = f.read()
-                    image = MIMEImage(img_data)
-                    image.add_header('Content-ID', '<signature>')
-                    image.add_header('Content-Disposition', 'inline', filename='signature.png')
-                    msg.attach(image)
+        Returns:
+            HTML fragment for the paragraph (empty for blank paragraphs)
+        """
+        primary_color = "#007cc1"  # Blue
+        
+        # Determine if this is a meeting email
+        is_meeting = "Réunion" in pole or "Meeting" in pole
+        
+        # Skip empty paragraphs
+        if not paragraph.strip():
+            return ''
+        
+        html = ''
+        
+        # Check for greeting
+        if i == 0 and ("Chers" in paragraph or "Bonsoir" in paragraph):
+            html += f'<div class="greeting">{paragraph}</div>\n'
+        # Meeting info detection (check for Date/Heure/Lien keywords or meeting links)
+        elif is_meeting and (any(keyword in paragraph for keyword in ["Date :", "Heure :", "Lien de la réunion"]) or "https://" in paragraph or "meet.google.com" in paragraph):
+            # Check if paragraph contains meeting link
+            if "https://" in paragraph or "meet.google.com" in paragraph:
+                # Split into lines and format each
+                lines = paragraph.split('\n')
+                html += '<div class="meeting-info">\n'
+                for line in lines:
+                    if "https://" in line or "meet.google.com" in line:
+                        # Extract the link
+                        link_match = re.search(r'https://[^\s]+', line)
+                        if link_match:
+                            link = link_match.group(0)
+                            html += f'<div class="meeting-link"><a href="{link}" target="_blank">Rejoindre la réunion</a></div>\n'
+                        else:
+                            html += f'<div style="margin: 8px 0; font-size: 17px;">{line}</div>\n'
+                    else:
+                        html += f'<div style="margin: 8px 0; font-size: 17px;">{line}</div>\n'
+                html += '</div>\n'
             else:
-                print(f"Warning: Signature file {signature_path} not found")
+                html += f'<div class="meeting-info">{paragraph.replace(chr(10), "<br>")}</div>\n'
+        # Check for special event header (AG invitation)
+        elif "cordialement conviés" in paragraph.lower():
+            html += f'<div class="event-header">{paragraph}</div>\n'
+        # Check for congratulations/important announcements
+        elif "félicitons" in paragraph.lower() or "accueillons" in paragraph.lower():
+            html += f'<div class="congratulations">{paragraph}</div>\n'
+        # Check for program/schedule sections with enhanced formatting
+        elif any(keyword in paragraph for keyword in ["Programme de la journée", "Ordre du jour"]):
+            # Split into lines and format as agenda items
+            lines = paragraph.split('\n')
+            html += f'<div class="program"><strong style="color: {primary_color}; font-size: 18px;">{lines[0]}</strong><br><br>\n'
+            for line in lines[1:]:
+                if line.strip() and not line.startswith(('Programme', 'Ordre')):
+                    html += f'<div class="agenda-item">{line}</div>\n'
+            html += '</div>\n'
+        # Check for important information sections
+        elif any(keyword in paragraph for keyword in ["Informations importantes", "IMPORTANT", "obligatoire", "strictement"]):
+            html += f'<div class="important">{paragraph.replace(chr(10), "<br>")}</div>\n'
+        # Check for closing/motivational message
+        elif any(keyword in paragraph.lower() for keyword in ["journée inaugurale marque", "au plaisir de", "À tout à l'heure", "exceptionnelle"]) and len(paragraph) > 50:
+            html += f'<div class="closing-message">{paragraph}</div>\n'
+        else:
+            # Add highlights to important words
+            styled_paragraph = self.highlighter_for_pole(pole).highlight(paragraph)
             
-            # Create SMTP session
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()  # Enable security
-                server.login(self.email, self.password)
-                
-                # Send email to all recipients (including CC)
-                server.send_message(msg, to_addrs=all_recipients)
-                
-            cc_info = f" (CC: {', '.join(self.cc_list)})" if self.cc_list else ""
-            print(f"Email sent successfully to: {', '.join(recipients)}{cc_info}")
-            return True
+            # Replace line breaks within paragraphs with <br>
+            styled_paragraph = styled_paragraph.replace('\n', '<br>')
             
-        except Exception as e:
-            print(f"Error sending email to {', '.join(recipients)}: {str(e)}")
-            return False
+            html += f'<div class="content">{styled_paragraph}</div>\n'
+        
+        return html
     
-    def send_bulk_email(self, csv_file: str, template_file: str, subject_suffix: str):
+    def convert_to_html(self, text: str, pole: str) -> str:
         """
-        Send one email to all recipients from CSV (for announcements like AG convocations)
+        Convert plain text template to HTML with styling
         
         Args:
-            csv_file: Path to CSV file
-            template_file: Path to template file
-            subject_suffix: Suffix for email subject
+            text: Plain text template
+            pole: Pole name for color theming
+            
+        Returns:
+            HTML formatted message
         """
-        # Read emails and template
-        emails = self.read_csv_emails(csv_file)
-        template = self.read_template(template_file)
+        # Split text into paragraphs and format them
+        paragraphs = text.strip().split('\n\n')
         
-        if not template:
-            print(f"Cannot send emails: template from {template_file} is empty")
-            return
+        parts = [self._html_head(pole)]
+        for i, paragraph in enumerate(paragraphs):
+            parts.append(self._render_paragraph(i, paragraph, pole))
+        parts.append(HTML_TAIL)
         
-        if not emails:
-            print(f"No emails found in {csv_file}")
-            return
+        return ''.join(parts)
+    
+    def compile_template(self, template: str, pole: str) -> CompiledTemplate:
+        """
+        Prepare a template for fast per-recipient HTML rendering
         
-        # For bulk emails, use generic greeting without personalization
-        generic_message = template.replace('[X]', 'Chers membres de Sesame Junior Entreprise')
+        Paragraphs without the [X] placeholder are converted to HTML once;
+        only the paragraphs containing it are rendered for each recipient.
+        Compiled templates are cached per (template, pole).
         
-        # Create subject without emojis
-        subject = f"Sesame Junior Entreprise - {subject_suffix}"
+        Args:
+            template: Email template containing the [X] placeholder
+            pole: Pole name for styling
+            
+        Returns:
+            CompiledTemplate producing the same HTML as convert_to_html
+        """
+        key = (template, pole)
+        compiled = self._compiled_templates.get(key)
+        if compiled is None:
+            compiled = CompiledTemplate(self, template, pole)
+            self._compiled_templates[key] = compiled
+        return compiled
+    
+    def _build_body(self, message: str, pole: str = "", html_message: Optional[str] = None) -> MIMEMultipart:
+        """
+        Build the MIME tree of an email (text, HTML and inline images), without
+        the addressing headers
+        """
+        # Create message
+        msg = MIMEMultipart('related')
         
-        # Collect all email addresses
-        all_recipients = []
-        for name, mail_sesame, mail_autre in emails:
-            all_recipients.append(mail_sesame)
-            if mail_autre:
-                all_recipients.append(mail_autre)
+        # Create multipart alternative for both HTML and plain text
+        msg_alternative = MIMEMultipart('alternative')
+        msg.attach(msg_alternative)
         
-        # Remove duplicates while preserving order
-        unique_recipients = []
-        seen = set()
-        for email in all_recipients:
-            if email not in seen:
-                unique_recipients.append(email)
-                seen.add(email)
+        # Add plain text version
+        text_part = MIMEText(message, 'plain', 'utf-8')
+        msg_alternative.attach(text_part)
         
-        print(f"\nSending bulk email from {csv_file} to {len(unique_recipients)} recipients...")
-        print(f"Recipients: {', '.join(unique_recipients[:5])}{'...' if len(unique_recipients) > 5 else ''}")
+        # Convert to HTML and add HTML version
+        if html_message is None:
+            html_message = self.convert_to_html(message, pole)
+        html_part = MIMEText(html_message, 'html', 'utf-8')
+        msg_alternative.attach(html_part)
         
-        # Send one email to all recipients
-        self.send_email(unique_recipients, subject, generic_message, subject_suffix, "all_members")
-
-    def process_csv_and_send(self, csv_file: str, template_file: str, subject_suffix: str):
+        # Add signature image (and other inline images), encoded once per file version
+        for content_id, image_path in self.inline_images.items():
+            image = self.image_cache.get(image_path, content_id)
+            if image is not None:
+                msg.attach(image)
+            else:
+                logger.warning(f"Warning: Inline image file {image_path} not found")
+        
+        return msg
+    
+    def _message_headers(self, recipients: List[str], subject: str, recipient_name: str = "", bcc: bool = False, include_cc: bool = True) -> Tuple[Message, List[str]]:
         """
-        Process a CSV file and send emails according to template
+        Build the addressing headers of an email
         
         Args:
-            csv_file: Path to CSV file
-            template_file: Path to template file
-            subject_suffix: Suffix for email subject (e.g., "Pole Projet")
+            bcc: Keep recipients out of the headers (To shows the sender)
+            include_cc: Copy the CC list on this email
+        
+        Returns:
+            Tuple (headers, envelope recipients including CC)
         """
-        # Read emails and template
-        emails = self.read_csv_emails(csv_file)
-        template = self.read_template(template_file)
+        headers = Message()
+        headers['From'] = self.email
+        headers['To'] = self.email if bcc else ', '.join(recipients)
         
-        if not template:
-            print(f"Cannot send emails: template from {template_file} is empty")
-            return
+        # Add CC if available
+        if self.cc_list and include_cc:
+            headers['Cc'] = ', '.join(self.cc_list)
+            # Add CC addresses to the actual recipient list for sending
+            all_recipients = recipients + self.cc_list
+        else:
+            all_recipients = recipients
         
-        if not emails:
-            print(f"No emails found in {csv_file}")
-            return
+        headers['Subject'] = Header(subject, 'utf-8')
         
-        # Create subject without emojis
-        if "Pole" in subject_suffix:
-            subject = f"Bienvenue à Sesame Junior Entreprise - {subject_suffix}"
-        else:
-            subject = f"Sesame Junior Entreprise - {subject_suffix}"
+        # Add unique headers to prevent threading
+        unique_id = f"{int(time.time())}.{uuid.uuid4().hex[:8]}"
+        headers['Message-ID'] = f"<welcome.{recipient_name.replace(' ', '.')}.{unique_id}@sesame.com.tn>"
+        headers['Date'] = time.strftime('%a, %d %b %Y %H:%M:%S %z')
         
-        print(f"\nProcessing {csv_file} with {len(emails)} email(s)...")
+        return headers, all_recipients
+    
+    def build_message(self, recipients: List[str], subject: str, message: str, pole: str = "", recipient_name: str = "", html_message: Optional[str] = None) -> Tuple[MIMEMultipart, List[str]]:
+        """
+        Build the HTML email with signature and CC for recipients
         
-        for name, mail_sesame, mail_autre in emails:
-            # Personalize message with the name from CSV
-            personalized_message = self.personalize_message(template, name)
-            
-            # Prepare recipients list
-            recipients = [mail_sesame]
-            if mail_autre:
-                recipients.append(mail_autre)
+        Args:
+            recipients: List of email addresses
+            subject: Email subject
+            message: Email body (plain text)
+            pole: Pole name for styling
+            recipient_name: Name of the recipient for unique message ID
+            html_message: Already rendered HTML body (rendered from message if omitted)
             
-            # Send email
-            print(f"Sending email to {name} ({', '.join(recipients)})...")
-            self.send_email(recipients, subject, personalized_message, subject_suffix, name)
-
-def load_config():
-    """
-    Load configuration from .env file
-    """
-    load_dotenv()
+        Returns:
+            Tuple (message, envelope recipients including CC)
+        """
+        msg = self._build_body(message, pole, html_message)
+        headers, all_recipients = self._message_headers(recipients, subject, recipient_name)
+        for name, value in headers.items():
+            msg[name] = value
+        return msg, all_recipients
+    
+    def _rendered_body(self, message: str, pole: str = "", html_message: Optional[str] = None) -> Tuple[bytes, bytes]:
+        """
+        Get the serialized MIME tree of an email from the message cache,
+        rendering it on a miss
+        
+        Returns:
+            Tuple (MIME headers, body) as sent on the wire
+        """
+        key = hashlib.sha256(f"{pole}\0{message}".encode('utf-8')).digest()
+        images = tuple(self.image_cache.get(path, content_id) for content_id, path in self.inline_images.items())
+        
+        cached = self.message_cache.get(key)
+        # Reuse only if the inline images did not change since
+        if cached is not None and cached[0] == images:
+            return cached[1], cached[2]
+        
+        mime_headers, body = self._serialize_body(message, pole, html_message)
+        self.message_cache.put(key, (images, mime_headers, body))
+        return mime_headers, body
+    
+    def _serialize_body(self, message: str, pole: str = "", html_message: Optional[str] = None) -> Tuple[bytes, bytes]:
+        """
+        Serialize the MIME tree built by _build_body without building it
+        
+        The parts are assembled directly as bytes (the inline images are
+        serialized once by the image cache), which gives the same output as
+        flattening the email package objects for a fraction of the cost.
+        
+        Returns:
+            Tuple (MIME headers, body) as sent on the wire
+        """
+        if html_message is None:
+            with self.metrics.timer('render'):
+                html_message = self.convert_to_html(message, pole)
+        eight_bit = self._eight_bit_body()
+        alternative_headers, alternative_body = _multipart('alternative', [
+            _text_part(message, 'plain', eight_bit),
+            _text_part(html_message, 'html', eight_bit),
+        ])
+        parts = [alternative_headers + b'\r\n' + alternative_body]
+        
+        for content_id, image_path in self.inline_images.items():
+            image = self.image_cache.get_serialized(image_path, content_id)
+            if image is not None:
+                parts.append(image[1])
+            else:
+                logger.warning(f"Warning: Inline image file {image_path} not found")
+        
+        return _multipart('related', parts)
+    
+    def _eight_bit_body(self) -> bool:
+        """
+        Whether the text parts are sent unencoded, asking the server once
+        (over a pooled session, kept for the sends) when eight_bit is None
+        """
+        if self.eight_bit is None:
+            if self.preview is not None or self.outbox is not None:
+                self.eight_bit = False
+            else:
+                conn = self.pool.acquire()
+                try:
+                    self.eight_bit = accepts_8bit(conn.server)
+                except Exception as e:
+                    # Base64 for now; the server is asked again on the next email
+                    self.pool.release(conn, broken=True)
+                    logger.warning(f"⚠️  Could not ask the server for 8BITMIME: {str(e)}")
+                    return False
+                self.pool.release(conn)
+        return self.eight_bit
+    
+    def render_message(self, recipients: List[str], subject: str, message: str, pole: str = "", recipient_name: str = "", html_message: Optional[str] = None, bcc: bool = False, include_cc: bool = True) -> Tuple[bytes, List[str]]:
+        """
+        Serialize the HTML email with signature and CC for recipients
+        
+        The MIME body is rendered once per distinct (message, pole) and reused;
+        only the From/To/Cc/Subject/Message-ID/Date headers are built per email.
+        
+        Args:
+            recipients: List of email addresses
+            subject: Email subject
+            message: Email body (plain text)
+            pole: Pole name for styling
+            recipient_name: Name of the recipient for unique message ID
+            html_message: Already rendered HTML body (rendered from message if omitted)
+            bcc: Keep recipients out of the headers (To shows the sender)
+            include_cc: Copy the CC list on this email
+            
+        Returns:
+            Tuple (message bytes with CRLF line endings, envelope recipients including CC)
+        """
+        with self.metrics.timer('serialize'):
+            mime_headers, body = self._rendered_body(message, pole, html_message)
+            headers, all_recipients = self._message_headers(recipients, subject, recipient_name, bcc, include_cc)
+            addressing = b''.join(self._header_lines(name, value) for name, value in headers.items())
+            return mime_headers + addressing + b'\r\n' + body, all_recipients
+    
+    def _header_lines(self, name: str, value) -> bytes:
+        """
+        Serialized header, with encoded headers (the Subject) cached
+        """
+        if isinstance(value, str):
+            return _header_line(name, value)
+        key = (name, str(value))
+        line = self._encoded_headers.get(key)
+        if line is None:
+            line = _header_line(name, value)
+            self._encoded_headers[key] = line
+        return line
+    
+    def _serialized(self, job: SendJob) -> Tuple[bytes, List[str]]:
+        """
+        Message bytes and envelope recipients of a job, rendered if needed
+        """
+        if job.data is not None:
+            return job.data, job.envelope
+        return self.render_message(job.recipients, job.subject, job.message, job.pole, job.name,
+                                   job.html, job.bcc, job.include_cc)
+    
+    def _deliver(self, job: SendJob, log_lines: Optional[List[str]] = None):
+        """
+        Render and send one email, raising on failure
+        
+        Args:
+            job: Email to send
+            log_lines: Collects the refused recipients instead of logging them
+        """
+        with self.metrics.timer('email'):
+            data, all_recipients = self._serialized(job)
+            if self.preview is not None:
+                self.preview.write(job.name, data, all_recipients)
+                return
+            retry = self.refused_to_retry(job.name, self.transmit(data, all_recipients), log_lines)
+            if retry:
+                # Only the temporarily refused recipients get the email again
+                job.data, job.envelope = data, list(retry)
+                raise smtplib.SMTPRecipientsRefused(retry)
+    
+    def transmit(self, data: bytes, all_recipients: List[str]) -> Dict[str, Tuple[int, bytes]]:
+        """
+        Send an already rendered email, raising on failure
+        
+        Args:
+            data: Message bytes with CRLF line endings
+            all_recipients: Envelope recipients, CC included
+            
+        Returns:
+            Recipients the server refused while delivering to the others,
+            with its reply
+        """
+        # Stay under the provider's sending quotas
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        
+        # Send email to all recipients (including CC) over a pooled session
+        with self.metrics.timer('data'):
+            refused = self.pool.send(lambda server: server.sendmail(self.email, all_recipients, data))
+        self.metrics.count('bytes_sent', len(data))
+        return refused or {}
+    
+    def refused_to_retry(self, name: str, refused: Dict[str, Tuple[int, bytes]],
+                         log_lines: Optional[List[str]] = None) -> Dict[str, Tuple[int, bytes]]:
+        """
+        Log the recipients refused by the server while the others got the email
+        
+        Args:
+            name: Recipient name of the email
+            refused: Refused addresses with the reply of the server (see transmit)
+            log_lines: Collects the lines instead of logging them, to keep them
+                       with the other lines of the email (see send_job)
+            
+        Returns:
+            The temporarily refused (4xx) addresses, worth sending the email to again
+        """
+        retry = {}
+        for address, (code, response) in refused.items():
+            reply = response.decode('utf-8', 'replace') if isinstance(response, bytes) else str(response)
+            temporary = 400 <= code < 500
+            if temporary:
+                retry[address] = (code, response)
+            line = f"🚫 {address} refused{f' for {name}' if name else ''}: {code} {reply}{'' if temporary else ' (permanent)'}"
+            if log_lines is not None:
+                log_lines.append(line)
+            else:
+                logger.warning(line, extra={'event': 'refused', 'recipient_name': name, 'address': address,
+                                            'error': f"{code} {reply}"})
+        return retry
+    
+    def _success_line(self, recipients: List[str], include_cc: bool = True) -> str:
+        if self.preview is not None:
+            return f"📝 Email for {', '.join(recipients)} written to {self.preview.path}"
+        cc_info = f" (CC: {', '.join(self.cc_list)})" if self.cc_list and include_cc else ""
+        return f"Email sent successfully to: {', '.join(recipients)}{cc_info}"
+    
+    def send_email(self, recipients: List[str], subject: str, message: str, pole: str = "", recipient_name: str = "") -> bool:
+        """
+        Send HTML email to recipients with signature and CC
+        
+        Args:
+            recipients: List of email addresses
+            subject: Email subject
+            message: Email body (plain text)
+            pole: Pole name for styling
+            recipient_name: Name of the recipient for unique message ID
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        job = SendJob(recipient_name, recipients, subject, message, pole)
+        for attempt in itertools.count(1):
+            try:
+                self._deliver(job)
+                logger.info(self._success_line(recipients), extra={'event': 'sent', 'recipients': recipients})
+                self.metrics.count('sent')
+                return True
+                
+            except Exception as e:
+                logger.error(f"Error sending email to {', '.join(recipients)}: {str(e)}",
+                             extra={'event': 'error', 'recipients': recipients, 'error': str(e), 'attempt': attempt})
+                if not self.retry_policy.should_retry(e, attempt):
+                    self.metrics.count('failed')
+                    return False
+                self.metrics.count('retries')
+                delay = self.retry_policy.delay(attempt)
+                logger.warning(f"⏳ Temporary failure, retrying in {delay:.0f}s (attempt {attempt + 1}/{self.retry_policy.max_attempts})")
+                time.sleep(delay)
+    
+    def send_job(self, job: SendJob) -> SendResult:
+        """
+        Send one job for the send engine, collecting log lines instead of logging them
+        
+        Args:
+            job: Email to send
+            
+        Returns:
+            SendResult describing the outcome
+        """
+        log_lines = [f"Sending email to {job.name} ({', '.join(job.recipients)})..."]
+        try:
+            self._deliver(job, log_lines)
+            log_lines.append(self._success_line(job.recipients, job.include_cc))
+            return SendResult(job.name, job.recipients, True, log_lines=log_lines)
+        except Exception as e:
+            log_lines.append(f"Error sending email to {', '.join(job.recipients)}: {str(e)}")
+            return SendResult(job.name, job.recipients, False, str(e), log_lines, transient=is_transient(e))
+    
+    def _journal_entry(self, job: SendJob) -> Tuple[str, str]:
+        """
+        Journal key (recipients, content hash) of a job
+        """
+        return recipient_key(job.recipients), content_hash(job.subject, job.message, job.pole)
+    
+    def _unsent(self, jobs: Iterable[SendJob], campaign: str) -> Iterator[SendJob]:
+        """
+        Drop the jobs the journal lists as already sent for a campaign
+        """
+        if self.journal is None:
+            yield from jobs
+            return
+        
+        skipped = 0
+        for job in jobs:
+            if self.journal.is_delivered(campaign, *self._journal_entry(job)):
+                skipped += 1
+                continue
+            yield job
+        if skipped:
+            logger.info(f"⏭️  Skipped {skipped} email(s) already sent in a previous run of {campaign}")
+    
+    def _record(self, campaign: str, job: SendJob, result: SendResult) -> SendResult:
+        """
+        Write the outcome of a job to the journal, if any
+        """
+        if self.journal is not None:
+            self.journal.record(campaign, *self._journal_entry(job),
+                                SENT if result.success else FAILED, result.error)
+        return result
+    
+    def _journaled(self, campaign: str):
+        """
+        send_job that records every outcome in the journal
+        """
+        return lambda job: self._record(campaign, job, self.send_job(job))
+    
+    def _enqueue(self, jobs: Iterable[SendJob], campaign: str, label: str) -> CampaignResult:
+        """
+        Render jobs into the outbox instead of sending them
+        
+        Returns:
+            CampaignResult with one successful result per queued email
+        """
+        result = CampaignResult(label)
+        
+        def items():
+            for job in jobs:
+                data, all_recipients = self._serialized(job)
+                result.add(SendResult(job.name, job.recipients, True))
+                yield (campaign, job.name, all_recipients, data, *self._journal_entry(job), job.include_cc)
+        
+        added = self.outbox.enqueue(items())
+        already = len(result) - added
+        logger.info(f"📥 {label}: {added} email(s) queued for delivery"
+              f"{f', {already} already queued' if already else ''} ({self.outbox.path})")
+        return result
+    
+    def _write_preview(self, jobs: Iterable[SendJob], label: str) -> CampaignResult:
+        """
+        Render jobs into the preview output instead of sending them
+        
+        Returns:
+            CampaignResult with one successful result per written email
+        """
+        result = CampaignResult(label)
+        for job in jobs:
+            data, all_recipients = self._serialized(job)
+            self.preview.write(job.name, data, all_recipients)
+            result.add(SendResult(job.name, job.recipients, True))
+        logger.info(f"📝 {label}: {len(result)} email(s) written to {self.preview.path} (nothing sent)")
+        return result
+    
+    def _divert(self, jobs: Iterable[SendJob], campaign: str, label: str) -> Optional[CampaignResult]:
+        """
+        Write jobs to the preview output or the outbox when one is configured
+        
+        Returns:
+            CampaignResult of the written emails, or None if the jobs must be sent
+        """
+        if self.preview is not None:
+            return self._write_preview(jobs, label)
+        if self.outbox is not None:
+            return self._enqueue(jobs, campaign, label)
+        return None
+    
+    def _reject(self, csv_file: str, recipient: Recipient, column: str, address: str, reason: str):
+        """
+        Log, count and report an address the validator rejected
+        """
+        logger.warning(f"🚫 Rejected {column} of {recipient.name} ({address}): {reason}",
+                       extra={'event': 'rejected', 'recipient_name': recipient.name, 'address': address,
+                              'reason': reason, 'file': csv_file})
+        self.metrics.count('rejected')
+        if self.reject_report is not None:
+            self.reject_report.add(csv_file, recipient.name, column, address, reason)
+    
+    def _validated(self, recipients: Iterable[Recipient], csv_file: str) -> Iterator[Recipient]:
+        """
+        Drop the rows whose mailSesame is rejected by the validator, and the
+        mailAutre of the others when it is rejected
+        """
+        if self.validator is None:
+            yield from recipients
+            return
+        
+        for recipient in recipients:
+            reason = self.validator.check(recipient.mail_sesame)
+            if reason is not None:
+                self._reject(csv_file, recipient, 'mailSesame', recipient.mail_sesame, reason)
+                continue
+            if recipient.mail_autre:
+                reason = self.validator.check(recipient.mail_autre)
+                if reason is not None:
+                    self._reject(csv_file, recipient, 'mailAutre', recipient.mail_autre, reason)
+                    recipient = Recipient(recipient.name, recipient.mail_sesame)
+            yield recipient
+    
+    def _bulk_recipients(self, csv_file: str) -> Iterator[str]:
+        """
+        Yield the unique email addresses of a CSV while it is read, preserving order
+        """
+        seen = SeenAddresses()
+        for recipient in self._validated(self.iter_csv_emails(csv_file), csv_file):
+            for address in recipient.addresses:
+                if seen.add(address):
+                    yield address
+    
+    def _bulk_message(self, template_file: str, subject_suffix: str) -> Optional[Tuple[str, str]]:
+        """
+        Read the template of a bulk email
+        
+        Returns:
+            Tuple (subject, message), or None if the template is empty
+        """
+        template = self.read_template(template_file)
+        
+        if not template:
+            logger.error(f"Cannot send emails: template from {template_file} is empty")
+            return None
+        
+        # For bulk emails, use generic greeting without personalization
+        generic_message = template.replace('[X]', 'Chers membres de Sesame Junior Entreprise')
+        
+        # Create subject without emojis
+        subject = f"Sesame Junior Entreprise - {subject_suffix}"
+        
+        return subject, generic_message
+    
+    def _prepare_bulk_email(self, csv_file: str, template_file: str, subject_suffix: str) -> Optional[Tuple[List[str], str, str]]:
+        """
+        Read the CSV and template of a bulk email
+        
+        Returns:
+            Tuple (unique recipients, subject, message), or None if there is nothing to send
+        """
+        bulk = self._bulk_message(template_file, subject_suffix)
+        if bulk is None:
+            return None
+        subject, generic_message = bulk
+        
+        unique_recipients = list(self._bulk_recipients(csv_file))
+        if not unique_recipients:
+            logger.warning(f"No emails found in {csv_file}")
+            return None
+        
+        logger.info(f"\nSending bulk email from {csv_file} to {len(unique_recipients)} recipients...")
+        logger.info(f"Recipients: {', '.join(unique_recipients[:5])}{'...' if len(unique_recipients) > 5 else ''}")
+        
+        return unique_recipients, subject, generic_message
+    
+    def send_bulk_email(self, csv_file: str, template_file: str, subject_suffix: str, batch_size: Optional[int] = None, workers: Optional[int] = None, campaign: Optional[str] = None) -> CampaignResult:
+        """
+        Send one email to all recipients from CSV (for announcements like AG convocations)
+        
+        With a batch size, recipients are split into envelopes of at most
+        `batch_size` addresses, sent as Bcc (To shows the sender) over pooled
+        sessions while the CSV is read. The CC list is copied on the first
+        batch only.
+        
+        Args:
+            csv_file: Path to CSV file
+            template_file: Path to template file
+            subject_suffix: Suffix for email subject
+            batch_size: Maximum recipients per envelope (defaults to
+                self.bulk_batch_size; None or 0 sends a single email)
+            workers: Number of batches sent in parallel (defaults to the pool size)
+            campaign: Journal name of the campaign (defaults to the CSV file
+                and subject suffix)
+            
+        Returns:
+            CampaignResult with one result per envelope
+        """
+        campaign = campaign or f"{csv_file}:{subject_suffix}"
+        batch_size = batch_size if batch_size is not None else self.bulk_batch_size
+        if not batch_size:
+            result = CampaignResult(csv_file)
+            bulk = self._prepare_bulk_email(csv_file, template_file, subject_suffix)
+            if bulk is None:
+                return result
+            unique_recipients, subject, generic_message = bulk
+            
+            job = SendJob("all_members", unique_recipients, subject, generic_message, subject_suffix)
+            if not any(self._unsent([job], campaign)):
+                return result
+            diverted = self._divert([job], campaign, csv_file)
+            if diverted is not None:
+                return diverted
+            
+            # Send one email to all recipients
+            success = self.send_email(unique_recipients, subject, generic_message, subject_suffix, "all_members")
+            result.add(self._record(campaign, job, SendResult("all_members", unique_recipients, success)))
+            return result
+        
+        bulk = self._bulk_message(template_file, subject_suffix)
+        if bulk is None:
+            return CampaignResult(csv_file)
+        subject, generic_message = bulk
+        
+        workers = workers or self.pool.size
+        self.pool.ensure_size(workers)
+        
+        logger.info(f"\nSending bulk email from {csv_file} in batches of {batch_size} recipients (Bcc)...")
+        
+        read = 0
+        
+        def batches():
+            nonlocal read
+            for job in self._bulk_batches(self._bulk_recipients(csv_file), subject, generic_message, subject_suffix, batch_size):
+                read += 1
+                yield job
+        
+        jobs = self._unsent(batches(), campaign)
+        result = self._divert(jobs, campaign, csv_file)
+        if result is None:
+            mark = self.metrics.mark()
+            result = SendEngine(workers, retry_policy=self.retry_policy, metrics=self.metrics).run(jobs, self._journaled(campaign), label=csv_file)
+            if read:
+                logger.info(f"{result.summary('batch(es)')} ({sum(len(r.recipients) for r in result.results)} recipients)")
+                logger.info(self.metrics.summary(mark))
+        if not read:
+            logger.warning(f"No emails found in {csv_file}")
+        flush_logging()
+        return result
+
+    def _prepare_campaign(self, csv_file: str, template_file: str, subject_suffix: str) -> Optional[Tuple[Iterator[Recipient], str, str]]:
+        """
+        Open the CSV and read the template of a personalized campaign
+        
+        Returns:
+            Tuple (rows streamed from the CSV, template, subject), or None if
+            there is nothing to send
+        """
+        template = self.read_template(template_file)
+        
+        if not template:
+            logger.error(f"Cannot send emails: template from {template_file} is empty")
+            return None
+        
+        # Read the first row only, the rest is streamed while sending
+        emails = self._validated(self.iter_csv_emails(csv_file, dedup=True), csv_file)
+        first = next(emails, None)
+        if first is None:
+            logger.warning(f"No emails found in {csv_file}")
+            return None
+        
+        return itertools.chain([first], emails), template, self._campaign_subject(subject_suffix)
+    
+    def _campaign_subject(self, subject_suffix: str) -> str:
+        """
+        Subject of a personalized campaign
+        """
+        # Create subject without emojis
+        if "Pole" in subject_suffix:
+            return f"Bienvenue à Sesame Junior Entreprise - {subject_suffix}"
+        return f"Sesame Junior Entreprise - {subject_suffix}"
+    
+    def _bulk_batches(self, addresses: Iterator[str], subject: str, message: str, subject_suffix: str, batch_size: int) -> Iterator[SendJob]:
+        """
+        Yield one Bcc SendJob per `batch_size` addresses (the CC list is
+        copied on the first batch only)
+        """
+        for number in itertools.count(1):
+            chunk = list(itertools.islice(addresses, batch_size))
+            if not chunk:
+                return
+            yield SendJob(f"batch {number}", chunk, subject, message, subject_suffix,
+                          bcc=True, include_cc=number == 1)
+    
+    def _personal_jobs(self, emails: Iterable[Recipient], template: str, subject: str, subject_suffix: str, campaign: str, render_processes: int) -> Iterator[SendJob]:
+        """
+        Personalized jobs of a campaign not sent yet, rendered in this process
+        or by `render_processes` processes
+        """
+        jobs = self._unsent(self._campaign_jobs(emails, template, subject, subject_suffix,
+                                                render_html=render_processes <= 1), campaign)
+        if render_processes > 1:
+            jobs = self._rendered_jobs(jobs, template, render_processes)
+        return self._cc_digests(jobs, campaign)
+    
+    def _cc_digests(self, jobs: Iterable[SendJob], campaign: str) -> Iterable[SendJob]:
+        """
+        Add the CC digests to the jobs of a personalized campaign, under the
+        'digest' CC policy
+        """
+        if self.cc_policy != DIGEST or not self.cc_list:
+            return jobs
+        return digest_jobs(jobs, self.cc_list, campaign, self.cc_digest_every)
+    
+    def _campaign_jobs(self, emails: Iterable[Recipient], template: str, subject: str, subject_suffix: str, render_html: bool = True):
+        """
+        Yield one personalized SendJob per CSV row
+        
+        Without render_html, the HTML body is left to whoever renders the job.
+        """
+        compiled = self.compile_template(template, subject_suffix) if render_html else None
+        for recipient in emails:
+            name = recipient.name
+            # Personalize message with the name from CSV
+            personalized_message = self.personalize_message(template, name)
+            
+            html = None
+            if compiled:
+                with self.metrics.timer('render'):
+                    html = compiled.render(name)
+            yield SendJob(name, recipient.addresses, subject, personalized_message, subject_suffix, html,
+                          include_cc=self.cc_policy == PER_MESSAGE)
+    
+    def _render_settings(self) -> dict:
+        """
+        Everything a render process needs to produce the same emails as this sender
+        """
+        return {
+            'smtp_server': self.smtp_server,
+            'smtp_port': self.smtp_port,
+            'email': self.email,
+            'cc_list': self.cc_list,
+            'highlight_keywords': self.highlight_keywords,
+            'inline_images': self.inline_images,
+            'eight_bit': self._eight_bit_body(),
+        }
+    
+    def _rendered_jobs(self, jobs: Iterable[SendJob], template: str, processes: int, chunk_size: int = 32) -> Iterator[SendJob]:
+        """
+        Render and serialize jobs in a pool of processes
+        
+        Jobs are sent to the processes in chunks and come back in order with
+        their message bytes set. At most two chunks per process are in
+        flight, so rendering stays a bounded distance ahead of the sending.
+        
+        Args:
+            jobs: Jobs to render (their HTML is rendered by the processes)
+            template: Template the jobs were personalized from
+            processes: Number of render processes
+            chunk_size: Jobs per task sent to a process
+            
+        Returns:
+            Iterator over the jobs, ready to send
+        """
+        jobs = iter(jobs)
+        with ProcessPoolExecutor(processes, initializer=_init_render_process,
+                                 initargs=(self._render_settings(),)) as executor:
+            pending = deque()
+            while True:
+                chunk = list(itertools.islice(jobs, chunk_size))
+                if chunk:
+                    rows = [(job.name, job.recipients, job.subject, job.message, job.pole, job.include_cc) for job in chunk]
+                    pending.append((chunk, executor.submit(_render_chunk, template, rows)))
+                if pending and (not chunk or len(pending) >= 2 * processes):
+                    done, future = pending.popleft()
+                    for job, (data, envelope) in zip(done, future.result()):
+                        job.data, job.envelope = data, envelope
+                        yield job
+                elif not chunk:
+                    return
+    
+    def process_csv_and_send(self, csv_file: str, template_file: str, subject_suffix: str, workers: Optional[int] = None, campaign: Optional[str] = None, render_processes: Optional[int] = None) -> CampaignResult:
+        """
+        Process a CSV file and send emails according to template
+        
+        With a journal, recipients already sent this campaign's content in a
+        previous (interrupted) run are skipped.
+        
+        Args:
+            csv_file: Path to CSV file
+            template_file: Path to template file
+            subject_suffix: Suffix for email subject (e.g., "Pole Projet")
+            workers: Number of emails sent in parallel, each over its own
+                SMTP session (defaults to the connection pool size)
+            campaign: Journal name of the campaign (defaults to the CSV file
+                and subject suffix)
+            render_processes: Processes rendering emails while they are sent
+                (defaults to self.render_processes)
+            
+        Returns:
+            CampaignResult with the outcome for every recipient
+        """
+        campaign = campaign or f"{csv_file}:{subject_suffix}"
+        render_processes = render_processes or self.render_processes
+        prepared = self._prepare_campaign(csv_file, template_file, subject_suffix)
+        if prepared is None:
+            return CampaignResult(csv_file)
+        emails, template, subject = prepared
+        
+        workers = workers or self.pool.size
+        self.pool.ensure_size(workers)
+        
+        logger.info(f"\nProcessing {csv_file}...")
+        
+        jobs = self._personal_jobs(emails, template, subject, subject_suffix, campaign, render_processes)
+        diverted = self._divert(jobs, campaign, csv_file)
+        if diverted is not None:
+            return diverted
+        mark = self.metrics.mark()
+        result = SendEngine(workers, retry_policy=self.retry_policy, metrics=self.metrics).run(jobs, self._journaled(campaign), label=csv_file)
+        logger.info(result.summary())
+        logger.info(self.metrics.summary(mark))
+        flush_logging()
+        return result
+    
+    def _manifest_jobs(self, campaign: Campaign, recipients: RecipientSet, render_processes: int) -> Optional[Iterator[SendJob]]:
+        """
+        Jobs of one campaign of a run not sent yet, or None if there is
+        nothing to send
+        """
+        if not recipients:
+            logger.warning(f"No emails found in {campaign.csv}")
+            return None
+        
+        if campaign.mode == BULK:
+            bulk = self._bulk_message(campaign.template, campaign.subject)
+            if bulk is None:
+                return None
+            subject, generic_message = bulk
+            subject = campaign.subject_prefix + subject
+            batch_size = campaign.batch_size if campaign.batch_size is not None else self.bulk_batch_size
+            if batch_size:
+                jobs = self._bulk_batches(recipients.addresses(), subject, generic_message, campaign.subject, batch_size)
+            else:
+                jobs = [SendJob("all_members", list(recipients.addresses()), subject, generic_message, campaign.subject)]
+            return self._unsent(jobs, campaign.name)
+        
+        template = self.read_template(campaign.template)
+        if not template:
+            logger.error(f"Cannot send emails: template from {campaign.template} is empty")
+            return None
+        subject = campaign.subject_prefix + self._campaign_subject(campaign.subject)
+        return self._personal_jobs(recipients, template, subject, campaign.subject, campaign.name, render_processes)
+    
+    def plan_campaigns(self, campaigns: List[Campaign]) -> CampaignPlan:
+        """
+        Read (and validate) every CSV of a run once and index their addresses
+        
+        Args:
+            campaigns: Campaigns of the run
+            
+        Returns:
+            CampaignPlan with the recipients of every CSV and their overlap
+        """
+        recipient_sets: Dict[str, RecipientSet] = {}
+        for campaign in campaigns:
+            if campaign.csv not in recipient_sets:
+                recipient_sets[campaign.csv] = self.read_csv_emails(campaign.csv, validate=True, merge=True)
+        return CampaignPlan(campaigns, recipient_sets)
+    
+    def _shared_content(self, campaign: Campaign) -> Optional[Tuple[str, str]]:
+        """
+        Subject and message of a campaign sending the same email to every
+        member, or None if it is personalized (or has no template)
+        """
+        if campaign.mode == BULK:
+            bulk = self._bulk_message(campaign.template, campaign.subject)
+            return None if bulk is None else (campaign.subject_prefix + bulk[0], bulk[1])
+        template = self.read_template(campaign.template)
+        if not template or '[X]' in template:
+            return None
+        return campaign.subject_prefix + self._campaign_subject(campaign.subject), template
+    
+    def _coalesced(self, campaigns: List[Campaign], plan: CampaignPlan) -> List[Tuple[List[Campaign], str, str, Iterator[SendJob]]]:
+        """
+        Merge the campaigns sending the same email (subject, body and pole)
+        into Bcc batches sent once to every distinct address
+        
+        Personalized campaigns whose template has no [X] are batched too.
+        
+        Returns:
+            Tuples (campaigns, journal name, label, jobs) of every merged group
+        """
+        groups: Dict[str, Tuple[List[Campaign], str, str]] = {}
+        for campaign in campaigns:
+            content = self._shared_content(campaign)
+            if content is not None:
+                key = content_hash(*content, campaign.subject)
+                groups.setdefault(key, ([], *content))[0].append(campaign)
+        
+        merged = []
+        for members, subject, message in groups.values():
+            if len(members) == 1 and members[0].mode == BULK:
+                continue  # Already a single email (or batches) to everyone
+            seen = set()
+            addresses = []
+            for member in members:
+                for address in plan.recipients[member.csv].addresses(merged=member.mode == BULK):
+                    key = normalize_address(address)
+                    if key not in seen:
+                        seen.add(key)
+                        addresses.append(address)
+            sizes = [member.batch_size for member in members if member.batch_size]
+            batch_size = min(sizes) if sizes else self.bulk_batch_size or COALESCE_BATCH_SIZE
+            separate = sum(len(plan.recipients[member.csv]) if member.mode == PERSONAL else 1 for member in members)
+            
+            name = '+'.join(member.name for member in members)
+            label = ' + '.join(f"{member.csv} ({member.subject})" for member in members)
+            logger.info(f"🔗 {label}: same email, sent once to {len(addresses)} address(es) in Bcc batches "
+                        f"of {batch_size} instead of {separate} separate email(s)")
+            jobs = self._bulk_batches(iter(addresses), subject, message, members[0].subject, batch_size)
+            merged.append((members, name, label, self._unsent(jobs, name)))
+        return merged
+    
+    def _campaign_streams(self, campaigns: List[Campaign], render_processes: Optional[int] = None,
+                          coalesce: bool = False) -> Tuple[Dict[str, CampaignResult], List[Tuple[str, Iterator[SendJob]]]]:
+        """
+        Plan a run of several campaigns: report their overlap, build the jobs
+        of every campaign (or merged group) and divert them to the preview
+        output or the outbox when one is configured
+        
+        Returns:
+            Results by journal name (filled for the diverted campaigns) and
+            the job streams left to send, by journal name
+        """
+        render_processes = render_processes or self.render_processes
+        personal = sum(1 for campaign in campaigns if campaign.mode == PERSONAL)
+        processes = max(1, render_processes // max(1, personal))
+        plan = self.plan_campaigns(campaigns)
+        logger.info(plan.report())
+        
+        # Jobs of every merged group or remaining campaign: (name, label, jobs)
+        units = []
+        merged = {}
+        for members, name, label, jobs in (self._coalesced(campaigns, plan) if coalesce else []):
+            for member in members:
+                merged[member.name] = (name, label, jobs) if member is members[0] else None
+        for campaign in campaigns:
+            if campaign.name in merged:
+                if merged[campaign.name] is not None:
+                    units.append(merged[campaign.name])
+                continue
+            label = f"{campaign.csv} ({campaign.subject})"
+            recipients = plan.recipients[campaign.csv]
+            jobs = self._manifest_jobs(campaign, recipients, processes)
+            if jobs is not None:
+                logger.info(f"\nProcessing {label}: {campaign.mode} email to {len(recipients)} member(s)...")
+            units.append((campaign.name, label, jobs))
+        
+        results: Dict[str, CampaignResult] = {}
+        streams = []
+        for name, label, jobs in units:
+            results[name] = CampaignResult(label)
+            if jobs is None:
+                continue
+            diverted = self._divert(jobs, name, label)
+            if diverted is not None:
+                results[name] = diverted
+                continue
+            streams.append((name, jobs))
+        
+        return results, streams
+    
+    def send_campaigns(self, campaigns: List[Campaign], workers: Optional[int] = None, render_processes: Optional[int] = None, coalesce: bool = False) -> List[CampaignResult]:
+        """
+        Send several campaigns in one run, over the same SMTP sessions
+        
+        Each CSV is read and validated once and shared by the campaigns using
+        it, and the overlap between campaigns is reported first. The emails
+        of every campaign go through a single send engine, one email of each
+        campaign in turn, so the sessions stay busy until the last email of
+        the run instead of draining at the end of every campaign. Rendered
+        templates, images and bodies are cached across campaigns as well.
+        
+        Args:
+            campaigns: Campaigns to send (see manifest.load_manifest), with
+                distinct names
+            workers: Number of emails sent in parallel (defaults to the pool size)
+            render_processes: Processes rendering personalized emails, shared
+                between the personalized campaigns (defaults to self.render_processes)
+            coalesce: Send the campaigns with the same non-personalized email
+                as Bcc batches, once per distinct address (see _coalesced)
+            
+        Returns:
+            One CampaignResult per campaign, in the same order (campaigns
+            merged by `coalesce` share one result, in place of the first)
+        """
+        workers = workers or self.pool.size
+        self.pool.ensure_size(workers)
+        results, streams = self._campaign_streams(campaigns, render_processes, coalesce)
+        
+        if streams:
+            mark = self.metrics.mark()
+            
+            def send(job: SendJob) -> SendResult:
+                result = self._record(job.campaign, job, self.send_job(job))
+                result.campaign = job.campaign
+                return result
+            
+            sent = SendEngine(workers, retry_policy=self.retry_policy, metrics=self.metrics).run(_interleave(streams), send)
+            for result in sent.results:
+                results[result.campaign].add(result)
+            for result in results.values():
+                logger.info(result.summary())
+            logger.info(self.metrics.summary(mark))
+        flush_logging()
+        return list(results.values())
+
+def _interleave(streams: List[Tuple[str, Iterator[SendJob]]]) -> Iterator[SendJob]:
+    """
+    Take one job of each campaign in turn, tagged with its campaign name,
+    until every campaign is exhausted
+    """
+    streams = deque(streams)
+    while streams:
+        campaign, jobs = streams.popleft()
+        job = next(jobs, None)
+        if job is None:
+            continue
+        job.campaign = campaign
+        yield job
+        streams.append((campaign, jobs))
+
+# Sender used by a render process, see EmailSender._rendered_jobs
+_render_sender: Optional[EmailSender] = None
+
+def _init_render_process(settings: dict):
+    """
+    Create the sender of a render process
+    """
+    global _render_sender
+    _render_sender = EmailSender(settings['smtp_server'], settings['smtp_port'], settings['email'], "",
+                                 highlight_keywords=settings['highlight_keywords'], cc_list=settings['cc_list'],
+                                 eight_bit=settings['eight_bit'])
+    _render_sender.inline_images = settings['inline_images']
+
+def _render_chunk(template: str, rows: List[Tuple[str, List[str], str, str, str, bool]]) -> List[Tuple[bytes, List[str]]]:
+    """
+    Render and serialize personalized emails in a render process
+    
+    Args:
+        template: Template the messages were personalized from
+        rows: Tuples (name, recipients, subject, message, pole, include_cc)
+        
+    Returns:
+        List of (message bytes, envelope recipients), one per row
+    """
+    sender = _render_sender
+    rendered = []
+    for name, recipients, subject, message, pole, include_cc in rows:
+        html = sender.compile_template(template, pole).render(name)
+        rendered.append(sender.render_message(recipients, subject, message, pole, name, html, include_cc=include_cc))
+    return rendered
+
+def load_config():
+    """
+    Load configuration from .env file
+    """
+    load_dotenv()
     
     sender_email = os.getenv('SENDER_EMAIL')
     sender_password = os.getenv('SENDER_PASSWORD')
-    smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')  # Default to Gmail
-    smtp_port = int(os.getenv('SMTP_PORT', '587'))  # Default to 587
+    # Defaults to Gmail on 587, or the local MTA for relay/lmtp/pickup
+    default_server, default_port = DEFAULT_SERVERS.get(transport_name(), DEFAULT_SERVERS[STARTTLS])
+    smtp_server = os.getenv('SMTP_SERVER', default_server)
+    smtp_port = int(os.getenv('SMTP_PORT', str(default_port)))
     
     return smtp_server, smtp_port, sender_email, sender_password
 
+def transport_name() -> str:
+    """
+    Transport set by SMTP_TRANSPORT in .env: starttls (default), ssl, relay,
+    lmtp or pickup
+    """
+    load_dotenv()
+    return os.getenv('SMTP_TRANSPORT', STARTTLS).lower()
+
+def credentials_missing(sender_email: Optional[str], sender_password: Optional[str]) -> bool:
+    """
+    Check whether .env lacks the sender address, or the password of a
+    transport that logs in
+    """
+    return not sender_email or (not sender_password and transport_name() in AUTHENTICATED)
+
+def parse_script_args(description: str) -> argparse.Namespace:
+    """
+    Parse the command line options shared by the send scripts
+    
+    Args:
+        description: What the script sends, shown by --help
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--preview', metavar='PATH',
+                        help="Write the emails to PATH (a .mbox file, or a directory of .eml files) "
+                             "instead of sending them")
+    return parser.parse_args()
+
+def load_sender_options(preview: Optional[str] = None) -> dict:
+    """
+    Load optional sending settings from .env file
+    
+    Args:
+        preview: Path the emails are written to instead of being sent
+            (a .mbox file or a directory of .eml files)
+    
+    Returns:
+        Keyword arguments for EmailSender
+    """
+    load_dotenv()
+    
+    journal_file = os.getenv('SEND_JOURNAL', '')
+    outbox_file = os.getenv('OUTBOX', '')
+    # Address checks before sending: 'syntax', 'mx' (syntax and domain) or 'off'
+    validation = os.getenv('VALIDATE_ADDRESSES', 'syntax').lower()
+    reject_file = os.getenv('REJECT_FILE', '')
+    # Unencoded text parts: 'auto' (if the server supports 8BITMIME), 'on' or 'off'
+    eight_bit = os.getenv('SMTP_8BITMIME', 'auto').lower()
+    smtp_server, smtp_port, sender_email, sender_password = load_config()
+    # Processes rendering personalized emails (0 = one per CPU core)
+    render_processes = int(os.getenv('RENDER_PROCESSES', '1')) or os.cpu_count() or 1
+    
+    # Provider sending quotas (0 or unset = no limit)
+    rate_limiter = RateLimiter(
+        per_minute=int(os.getenv('SMTP_MAX_PER_MINUTE', '0')),
+        per_hour=int(os.getenv('SMTP_MAX_PER_HOUR', '0')),
+        per_day=int(os.getenv('SMTP_MAX_PER_DAY', '0'))
+    )
+    
+    return {
+        'pool_size': int(os.getenv('SMTP_CONNECTIONS', '1')),  # Parallel SMTP sessions
+        'bulk_batch_size': int(os.getenv('BULK_BATCH_SIZE', '0')) or None,  # Bcc recipients per bulk email
+        'rate_limiter': rate_limiter if rate_limiter else None,
+        'retry_policy': RetryPolicy(max_attempts=int(os.getenv('SMTP_MAX_ATTEMPTS', '4'))),  # Tries per email
+        'journal': SendJournal(journal_file) if journal_file else None,  # Resume interrupted campaigns
+        'outbox': Outbox(outbox_file) if outbox_file and not preview else None,  # Queue emails for delivery_worker.py
+        'render_processes': render_processes,
+        'preview': open_preview(preview) if preview else None,  # Render only, no network
+        'metrics_file': os.getenv('METRICS_FILE') or None,  # Prometheus text, or JSON lines if .jsonl
+        'validator': AddressValidator(check_domains=validation == 'mx') if validation != 'off' else None,
+        'reject_report': RejectReport(reject_file) if reject_file else None,  # CSV of the rejected addresses
+        'cc_policy': os.getenv('CC_POLICY', PER_MESSAGE).lower(),  # 'message' or 'digest'
+        'cc_digest_every': int(os.getenv('CC_DIGEST_EVERY', '0')) or None,  # Emails per digest (0 = one per campaign)
+        'transport': open_transport(transport_name(), smtp_server, smtp_port, sender_email, sender_password,
+                                    pickup_dir=os.getenv('PICKUP_DIR', 'pickup')),  # SMTP, local relay, LMTP or pickup
+        'eight_bit': None if eight_bit == 'auto' else eight_bit in ('on', '1', 'true', 'yes'),
+    }
+
 def main():
     """
     Main function to configure and run the email sender
     """
+    args = parse_script_args("Send the welcome and convocation emails of MC.csv, Projet.csv and all.csv")
+    
     print("=== Sesame Junior Entreprise - Welcome Email Sender ===\n")
     
     # Try to load configuration from .env file
     smtp_server, smtp_port, sender_email, sender_password = load_config()
     
-    if not sender_email or not sender_password:
+    if credentials_missing(sender_email, sender_password):
         print("⚠️  CONFIGURATION NEEDED:")
         print("Please ensure your .env file contains:")
         print("SENDER_EMAIL=your_email@domain.com")
         print("SENDER_PASSWORD=your_password")
         print("SMTP_SERVER=smtp.gmail.com (optional, defaults to Gmail)")
         print("SMTP_PORT=587 (optional, defaults to 587)")
+        print("SMTP_TRANSPORT=starttls (optional: ssl, relay, lmtp or pickup)")
         return
     
     print(f"Using email: {sender_email}")
     print(f"🌐 SMTP server: {smtp_server}:{smtp_port}")
     
     # Ask for confirmation before sending
-    response = input("\n🚀 Ready to send welcome emails? (y/n): ").lower().strip()
-    if response != 'y':
-        print("Operation cancelled.")
-        return
+    if args.preview:
+        print(f"\n📝 Preview mode: emails are written to {args.preview}, nothing is sent")
+    else:
+        response = input("\n🚀 Ready to send welcome emails? (y/n): ").lower().strip()
+        if response != 'y':
+            print("Operation cancelled.")
+            return
     
     # Initialize email sender
-    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password)
-    
-    # Process Marketing Commercial emails
-    if os.path.exists("MC.csv"):
-        email_sender.process_csv_and_send(
-            csv_file="MC.csv",
-            template_file="templateMC.txt", 
-            subject_suffix="Pole Marketing Commercial"
-        )
-    else:
-        print("⚠️  MC.csv not found, skipping Marketing Commercial emails")
-    
-    # Process Projet emails
-    if os.path.exists("Projet.csv"):
-        email_sender.process_csv_and_send(
-            csv_file="Projet.csv",
-            template_file="templateProjet.txt",
-            subject_suffix="Pole Projet"
-        )
-    else:
-        print("⚠️  Projet.csv not found, skipping Projet emails")
-    
-    # Process Convocation emails for all members
-    if os.path.exists("all.csv"):
-        email_sender.process_csv_and_send(
-            csv_file="all.csv",
-            template_file="ConvocationAGetVisite.txt",
-            subject_suffix="Convocation - AG et Visite CTJE"
-        )
-    else:
-        print("⚠️  all.csv not found, skipping Convocation emails")
+    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password, **load_sender_options(args.preview))
+    
+    # Welcome emails per pole, then the convocation of all members, sent
+    # together over the same SMTP sessions
+    campaigns = []
+    for csv_file, template_file, subject_suffix, skipped in [
+        ("MC.csv", "templateMC.txt", "Pole Marketing Commercial", "Marketing Commercial"),
+        ("Projet.csv", "templateProjet.txt", "Pole Projet", "Projet"),
+        ("all.csv", "ConvocationAGetVisite.txt", "Convocation - AG et Visite CTJE", "Convocation"),
+    ]:
+        if os.path.exists(csv_file):
+            campaigns.append(Campaign(csv_file, template_file, subject_suffix))
+        else:
+            print(f"⚠️  {csv_file} not found, skipping {skipped} emails")
+    
+    email_sender.send_campaigns(campaigns)
+    email_sender.close()
     
     print("\n✅ All emails processed!")
 
@@ -0,0 +1,111 @@
+"""
+Campaign manifest
+Describes the campaigns of a run (CSV, template, subject, personal or bulk)
+in a TOML file, or YAML when PyYAML is installed (pip install pyyaml):
+
+    [[campaign]]
+    csv = "MC.csv"
+    template = "templateMC.txt"
+    subject = "Pole Marketing Commercial"
+    mode = "personal"
+"""
+from typing import List, Optional
+
+try:
+    import tomllib
+except ImportError:  # pragma: no cover - Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - optional dependency
+    yaml = None
+
+PERSONAL = 'personal'
+BULK = 'bulk'
+MODES = (PERSONAL, BULK)
+
+
+class Campaign:
+    __slots__ = ('csv', 'template', 'subject', 'mode', 'name', 'batch_size', 'subject_prefix')
+
+    def __init__(self, csv: str, template: str, subject: str, mode: str = PERSONAL,
+                 name: Optional[str] = None, batch_size: Optional[int] = None, subject_prefix: str = ""):
+        """
+        One campaign of a run
+
+        Args:
+            csv: Recipients CSV (name, mailSesame, mailAutre)
+            template: Template file
+            subject: Subject suffix, also the pole name used for styling
+            mode: 'personal' (one email per member, [X] replaced by the name)
+                or 'bulk' (one email to everyone, or Bcc batches)
+            name: Journal name (defaults to the CSV file and subject, as the
+                send scripts use)
+            batch_size: Recipients per Bcc batch of a bulk campaign (defaults
+                to the sender's bulk_batch_size)
+            subject_prefix: Text put before the subject (e.g. for test runs)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown campaign mode {mode!r} (expected {' or '.join(MODES)})")
+        self.csv = csv
+        self.template = template
+        self.subject = subject
+        self.mode = mode
+        self.name = name or f"{csv}:{subject}"
+        self.batch_size = batch_size
+        self.subject_prefix = subject_prefix
+
+    def __repr__(self) -> str:
+        return f"Campaign({self.name!r}, mode={self.mode!r})"
+
+
+def load_manifest(path: str) -> List[Campaign]:
+    """
+    Read the campaigns of a manifest file
+
+    Args:
+        path: .toml file, or .yaml/.yml file (requires PyYAML)
+
+    Returns:
+        Campaigns in the order of the file
+
+    Raises:
+        ValueError: If the manifest is malformed
+    """
+    if path.lower().endswith(('.yaml', '.yml')):
+        if yaml is None:
+            raise ValueError(f"Reading {path} requires PyYAML: pip install pyyaml")
+        with open(path, 'r', encoding='utf-8') as file:
+            data = yaml.safe_load(file) or {}
+    else:
+        if tomllib is None:
+            raise ValueError(f"Reading {path} requires Python 3.11 or tomli: pip install tomli")
+        with open(path, 'rb') as file:
+            try:
+                data = tomllib.load(file)
+            except tomllib.TOMLDecodeError as e:
+                raise ValueError(f"Invalid manifest {path}: {e}") from e
+
+    entries = data.get('campaign', [])
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"No [[campaign]] entries in {path}")
+
+    campaigns = []
+    for number, entry in enumerate(entries, 1):
+        missing = [key for key in ('csv', 'template', 'subject') if not entry.get(key)]
+        if missing:
+            raise ValueError(f"Campaign {number} of {path} is missing {', '.join(missing)}")
+        unknown = set(entry) - set(Campaign.__slots__)
+        if unknown:
+            raise ValueError(f"Campaign {number} of {path} has unknown keys: {', '.join(sorted(unknown))}")
+        campaigns.append(Campaign(**entry))
+
+    names = [campaign.name for campaign in campaigns]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Campaign names must be unique in {path}: {', '.join(duplicates)} (set name = ...)")
+    return campaigns
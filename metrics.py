@@ -0,0 +1,169 @@
+"""
+Send metrics
+Timers for each phase of sending an email (connect, STARTTLS, AUTH, render,
+serialize, SMTP transaction) and counters of sent/failed emails, retries and
+bytes, with percentile summaries and Prometheus/JSONL export.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# Timers, in the order of a send:
+#   connect    TCP connection and server greeting
+#   starttls   STARTTLS negotiation
+#   auth       SMTP authentication
+#   render     HTML rendering of a message
+#   serialize  MIME serialization of a message
+#   data       SMTP transaction of a message (MAIL, RCPT, DATA)
+#   email      Whole send of an email (serialization, quota wait, SMTP), retries excluded
+PHASES = ('connect', 'starttls', 'auth', 'render', 'serialize', 'data', 'email')
+COUNTER_HELP = {
+    'sent': "Emails accepted by the server",
+    'failed': "Emails given up after an error",
+    'retries': "Retries scheduled after a temporary failure",
+    'bytes_sent': "Message bytes accepted by the server",
+    'connections': "SMTP sessions opened",
+    'rejected': "Addresses rejected by validation before sending",
+}
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile of sorted values
+    """
+    index = max(0, min(len(ordered) - 1, round(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Metrics:
+    def __init__(self):
+        """
+        Initialize empty timers and counters (thread-safe)
+        """
+        self.timings: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+        self.counters: Dict[str, int] = {counter: 0 for counter in COUNTER_HELP}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        """
+        Time the enclosed block (recorded even if it raises)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            self.timings.setdefault(phase, []).append(seconds)
+
+    def count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def mark(self) -> dict:
+        """
+        Current position of every timer and counter, to summarize only what
+        happens after it (e.g. one campaign)
+        """
+        with self._lock:
+            return {
+                'timings': {phase: len(values) for phase, values in self.timings.items()},
+                'counters': dict(self.counters),
+            }
+
+    def snapshot(self, since: Optional[dict] = None) -> dict:
+        """
+        Statistics of every timer (seconds) and counter
+
+        Args:
+            since: Mark returned by mark(); everything is included if omitted
+
+        Returns:
+            Dict with 'timings' {phase: {count, sum, p50, p90, p99, max}} and
+            'counters' {counter: value}
+        """
+        since = since or {'timings': {}, 'counters': {}}
+        with self._lock:
+            timings = {phase: sorted(values[since['timings'].get(phase, 0):])
+                       for phase, values in self.timings.items()}
+            counters = {counter: value - since['counters'].get(counter, 0)
+                        for counter, value in self.counters.items()}
+
+        stats = {}
+        for phase, values in timings.items():
+            if not values:
+                continue
+            stats[phase] = {'count': len(values), 'sum': sum(values), 'max': values[-1]}
+            for q in QUANTILES:
+                stats[phase][f"p{round(q * 100)}"] = percentile(values, q)
+        return {'timings': stats, 'counters': counters}
+
+    def summary(self, since: Optional[dict] = None) -> str:
+        """
+        Human-readable timing percentiles and counters
+
+        Args:
+            since: Mark returned by mark(); everything is included if omitted
+        """
+        snapshot = self.snapshot(since)
+        counters = snapshot['counters']
+        lines = [f"⏱️  {counters['sent']} sent, {counters['failed']} failed, {counters['retries']} retries, "
+                 f"{counters['connections']} connection(s), {counters['bytes_sent'] / (1024 * 1024):.1f} MB"]
+        for phase, stats in snapshot['timings'].items():
+            lines.append(f"   {phase:<10}{stats['count']:>8} × p50 {stats['p50'] * 1e3:8.2f} ms"
+                         f"  p90 {stats['p90'] * 1e3:8.2f} ms  p99 {stats['p99'] * 1e3:8.2f} ms"
+                         f"  max {stats['max'] * 1e3:8.2f} ms")
+        return '\n'.join(lines)
+
+    def to_prometheus(self, prefix: str = 'autosender') -> str:
+        """
+        Metrics in the Prometheus text exposition format
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for counter, value in snapshot['counters'].items():
+            name = f"{prefix}_{counter}_total"
+            lines.append(f"# HELP {name} {COUNTER_HELP.get(counter, counter)}")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+
+        name = f"{prefix}_phase_seconds"
+        lines.append(f"# HELP {name} Duration of each phase of sending an email")
+        lines.append(f"# TYPE {name} summary")
+        for phase, stats in snapshot['timings'].items():
+            for q in QUANTILES:
+                lines.append(f'{name}{{phase="{phase}",quantile="{q}"}} {stats[f"p{round(q * 100)}"]:.6f}')
+            lines.append(f'{name}_sum{{phase="{phase}"}} {stats["sum"]:.6f}')
+            lines.append(f'{name}_count{{phase="{phase}"}} {stats["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def to_jsonl(self) -> str:
+        """
+        One JSON line per timer and counter, stamped with the current time
+        """
+        snapshot = self.snapshot()
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+        lines = [json.dumps({'timestamp': timestamp, 'counter': counter, 'value': value})
+                 for counter, value in snapshot['counters'].items()]
+        lines += [json.dumps({'timestamp': timestamp, 'phase': phase, **stats})
+                  for phase, stats in snapshot['timings'].items()]
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str):
+        """
+        Write the metrics to a file: appended as JSONL if the path ends with
+        .jsonl, replaced in the Prometheus text format otherwise (for the
+        node_exporter textfile collector)
+        """
+        if path.lower().endswith('.jsonl'):
+            with open(path, 'a', encoding='utf-8') as file:
+                file.write(self.to_jsonl())
+        else:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(self.to_prometheus())
@@ -0,0 +1,204 @@
+"""
+Outbound queue
+SQLite spool of fully rendered emails. The send scripts enqueue a campaign in
+seconds and delivery_worker.py delivers it, so the scripts do not have to stay
+alive for the whole campaign.
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+QUEUED = 'queued'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+
+class OutboxItem(NamedTuple):
+    id: int
+    campaign: str
+    name: str
+    recipients: List[str]  # Envelope recipients, CC included
+    data: bytes  # Message with CRLF line endings
+    address: str  # Journal key of the recipients
+    digest: str  # Content hash of the message
+    include_cc: bool
+    attempts: int
+
+
+class Outbox:
+    def __init__(self, path: str):
+        """
+        Open (or create) a queue file
+
+        Several delivery workers (threads or processes) can drain the same
+        queue: every email is claimed by exactly one of them.
+
+        Args:
+            path: Path to the SQLite queue file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                campaign TEXT NOT NULL,
+                name TEXT NOT NULL,
+                recipients TEXT NOT NULL,
+                data BLOB NOT NULL,
+                address TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                include_cc INTEGER NOT NULL DEFAULT 1,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                claimed_at REAL,
+                error TEXT,
+                UNIQUE (campaign, address, content_hash)
+            )
+        """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)"
+        )
+
+    def enqueue(self, items: Iterable[tuple], chunk_size: int = 500) -> int:
+        """
+        Add rendered emails to the queue
+
+        Emails already queued for the same campaign, recipients and content
+        are ignored, so enqueueing a campaign twice does not send it twice.
+
+        Args:
+            items: Tuples (campaign, name, envelope recipients, message bytes,
+                recipients key, content hash, include_cc)
+            chunk_size: Emails written per transaction
+
+        Returns:
+            Number of emails added
+        """
+        added = 0
+        rows = []
+
+        def flush():
+            nonlocal added
+            with self._lock:
+                before = self._connection.total_changes
+                self._connection.execute("BEGIN IMMEDIATE")
+                try:
+                    self._connection.executemany(
+                        "INSERT OR IGNORE INTO outbox "
+                        "(campaign, name, recipients, data, address, content_hash, include_cc) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    self._connection.execute("COMMIT")
+                except BaseException:
+                    self._connection.execute("ROLLBACK")
+                    raise
+                added += self._connection.total_changes - before
+            rows.clear()
+
+        for campaign, name, recipients, data, address, digest, include_cc in items:
+            rows.append((campaign, name, json.dumps(recipients), data, address, digest, int(include_cc)))
+            if len(rows) >= chunk_size:
+                flush()
+        if rows:
+            flush()
+        return added
+
+    def claim(self) -> Optional[OutboxItem]:
+        """
+        Take the oldest email due for delivery
+
+        Returns:
+            The claimed email, or None if nothing is due
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    "SELECT id, campaign, name, recipients, data, address, content_hash, include_cc, attempts "
+                    "FROM outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY id LIMIT 1",
+                    (QUEUED, now)
+                ).fetchone()
+                if row is not None:
+                    self._connection.execute(
+                        "UPDATE outbox SET status = ?, claimed_at = ?, attempts = attempts + 1 WHERE id = ?",
+                        (SENDING, now, row[0])
+                    )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        item_id, campaign, name, recipients, data, address, digest, include_cc, attempts = row
+        return OutboxItem(item_id, campaign, name, json.loads(recipients), bytes(data), address, digest,
+                          bool(include_cc), attempts + 1)
+
+    def _update(self, sql: str, parameters: tuple):
+        with self._lock:
+            self._connection.execute(sql, parameters)
+
+    def mark_sent(self, item: OutboxItem):
+        """
+        Record a delivered email
+        """
+        self._update("UPDATE outbox SET status = ?, error = NULL WHERE id = ?", (SENT, item.id))
+
+    def mark_failed(self, item: OutboxItem, error: str, retry_in: Optional[float] = None):
+        """
+        Record a failed delivery
+
+        Args:
+            item: Email that failed
+            error: Error message
+            retry_in: Seconds before the email is tried again (None gives up)
+                to the recipients of the item
+        """
+        if retry_in is None:
+            self._update("UPDATE outbox SET status = ?, error = ? WHERE id = ?", (FAILED, error, item.id))
+        else:
+            self._update("UPDATE outbox SET status = ?, error = ?, next_attempt_at = ?, recipients = ? WHERE id = ?",
+                         (QUEUED, error, time.time() + retry_in, json.dumps(item.recipients), item.id))
+
+    def requeue_stale(self, older_than: float = 600.0) -> int:
+        """
+        Put back emails claimed by a worker that stopped before finishing them
+
+        Args:
+            older_than: Seconds after which a claim is considered abandoned
+
+        Returns:
+            Number of emails put back in the queue
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE outbox SET status = ? WHERE status = ? AND claimed_at < ?",
+                (QUEUED, SENDING, time.time() - older_than)
+            )
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Number of emails per status
+        """
+        with self._lock:
+            rows = self._connection.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return dict(rows)
+
+    def pending(self) -> int:
+        """
+        Number of emails not delivered or given up yet
+        """
+        counts = self.counts()
+        return counts.get(QUEUED, 0) + counts.get(SENDING, 0)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,86 @@
+"""
+Campaign planning
+Global address index across the CSVs of a multi-campaign run: which
+campaigns each address is part of, how many members get several emails and
+how much every pair of campaigns overlaps.
+"""
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+from manifest import BULK, Campaign
+from recipients import RecipientSet, normalize_address
+
+
+class CampaignPlan:
+    def __init__(self, campaigns: Sequence[Campaign], recipients: Dict[str, RecipientSet]):
+        """
+        Index the addresses of every campaign
+
+        Args:
+            campaigns: Campaigns of the run
+            recipients: Recipients of every CSV used by the campaigns
+        """
+        self.campaigns = list(campaigns)
+        self.recipients = recipients
+        # Normalized address -> bit mask of the campaigns sending to it
+        self._index: Dict[str, int] = {}
+        for bit, campaign in enumerate(self.campaigns):
+            flag = 1 << bit
+            # Personalized emails go to the members, not the merged duplicate rows
+            for address in recipients[campaign.csv].addresses(merged=campaign.mode == BULK):
+                key = normalize_address(address)
+                self._index[key] = self._index.get(key, 0) | flag
+        # Number of addresses per combination of campaigns
+        self._combinations = Counter(self._index.values())
+
+    def _members(self, mask: int) -> List[Campaign]:
+        return [campaign for bit, campaign in enumerate(self.campaigns) if mask >> bit & 1]
+
+    def campaigns_of(self, address: str) -> List[Campaign]:
+        """
+        Campaigns sending to an address, whatever its case
+        """
+        return self._members(self._index.get(normalize_address(address), 0))
+
+    @property
+    def addresses(self) -> int:
+        """
+        Distinct addresses of the run
+        """
+        return len(self._index)
+
+    @property
+    def deliveries(self) -> int:
+        """
+        Emails the run delivers, one per address of every campaign
+        """
+        return sum(count * bin(mask).count('1') for mask, count in self._combinations.items())
+
+    @property
+    def shared(self) -> int:
+        """
+        Addresses receiving the emails of several campaigns
+        """
+        return sum(count for mask, count in self._combinations.items() if mask & (mask - 1))
+
+    def overlap(self) -> Dict[Tuple[Campaign, Campaign], int]:
+        """
+        Addresses shared by every pair of campaigns that have some in common
+        """
+        pairs: Dict[Tuple[Campaign, Campaign], int] = Counter()
+        for mask, count in self._combinations.items():
+            members = self._members(mask)
+            for i, first in enumerate(members):
+                for second in members[i + 1:]:
+                    pairs[(first, second)] += count
+        return dict(pairs)
+
+    def report(self) -> str:
+        """
+        Human-readable overlap summary
+        """
+        lines = [f"🗺️  {len(self.campaigns)} campaign(s), {self.addresses} distinct address(es), "
+                 f"{self.deliveries} email(s) to deliver; {self.shared} address(es) in several campaigns"]
+        for (first, second), count in sorted(self.overlap().items(), key=lambda item: -item[1]):
+            lines.append(f"   {count:>7} shared by {first.csv} ({first.subject}) and {second.csv} ({second.subject})")
+        return '\n'.join(lines)
@@ -0,0 +1,103 @@
+"""
+Campaign preview
+Writes the exact emails a campaign would send to .eml files or a single mbox
+file instead of sending them, to check or diff a campaign without any network.
+"""
+import os
+import re
+import threading
+import time
+from typing import List, Union
+
+# Output buffer of the mbox file, written in large blocks
+BUFFER_SIZE = 1024 * 1024
+
+_UNSAFE_FILENAME = re.compile(r'[^\w.@-]+')
+_MBOX_FROM_LINE = re.compile(rb'^(>*From )', re.MULTILINE)
+
+
+class EmlWriter:
+    def __init__(self, directory: str):
+        """
+        Write each email to its own .eml file in a directory
+
+        Args:
+            directory: Output directory (created if missing)
+        """
+        self.path = directory
+        self.count = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, name: str, data: bytes, envelope: List[str]):
+        """
+        Write one email
+
+        Args:
+            name: Recipient name, used in the file name
+            data: Message bytes with CRLF line endings
+            envelope: Envelope recipients, CC included
+        """
+        with self._lock:
+            self.count += 1
+            number = self.count
+        filename = f"{number:06d}-{_UNSAFE_FILENAME.sub('_', name or 'email')[:60]}.eml"
+        # One write per file, the message is already in memory
+        with open(os.path.join(self.path, filename), 'wb') as file:
+            file.write(data)
+
+    def close(self):
+        pass
+
+
+class MboxWriter:
+    def __init__(self, path: str, sender: str = "MAILER-DAEMON"):
+        """
+        Append every email to a single mbox file (mboxrd format)
+
+        Args:
+            path: Output file (overwritten)
+            sender: Address of the "From " separator lines
+        """
+        self.path = path
+        self.sender = sender
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'wb', buffering=BUFFER_SIZE)
+
+    def write(self, name: str, data: bytes, envelope: List[str]):
+        """
+        Write one email
+
+        Args:
+            name: Recipient name (unused, mbox has no per-email name)
+            data: Message bytes with CRLF line endings
+            envelope: Envelope recipients, CC included
+        """
+        body = data.replace(b'\r\n', b'\n')
+        # Quote body lines starting with "From " (mboxrd), rare in encoded emails
+        if b'From ' in body:
+            body = _MBOX_FROM_LINE.sub(rb'>\1', body)
+        separator = f"From {self.sender} {time.asctime()}\n".encode('ascii', 'replace')
+        with self._lock:
+            self._file.write(separator + body + (b'\n' if body.endswith(b'\n') else b'\n\n'))
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def open_preview(path: str, sender: str = "MAILER-DAEMON") -> Union[EmlWriter, MboxWriter]:
+    """
+    Open a preview output: a single mbox file if the path ends with .mbox,
+    a directory of .eml files otherwise
+
+    Args:
+        path: Output path
+        sender: Address of the mbox "From " separator lines
+    """
+    if path.lower().endswith('.mbox'):
+        return MboxWriter(path, sender)
+    return EmlWriter(path)
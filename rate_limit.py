@@ -0,0 +1,107 @@
+"""
+Send rate limiter
+Paces emails to stay under the provider's per-minute, per-hour and per-day
+sending quotas instead of failing with 421/454 errors partway through.
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable, Optional
+
+from send_logging import logger
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+
+class RateLimiter:
+    def __init__(self, per_minute: Optional[int] = None, per_hour: Optional[int] = None,
+                 per_day: Optional[int] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the limiter with one token bucket per quota
+
+        Each bucket holds `limit` tokens and a token spent on a send comes back
+        exactly one period later, so no window of that length ever contains
+        more than `limit` sends while bursts up to the limit go out at once.
+        Sends of earlier runs count once seeded (see seed), e.g. from the
+        send journal.
+
+        Args:
+            per_minute: Maximum emails in any 60 seconds (None for no limit)
+            per_hour: Maximum emails in any hour (None for no limit)
+            per_day: Maximum emails in any 24 hours (None for no limit)
+            clock: Monotonic clock in seconds
+            sleep: Function used to wait
+        """
+        self.clock = clock
+        self.sleep = sleep
+        # (limit, period, times of the last `limit` sends)
+        self.buckets = [
+            (limit, period, deque(maxlen=limit))
+            for limit, period in ((per_minute, MINUTE), (per_hour, HOUR), (per_day, DAY))
+            if limit
+        ]
+        self._lock = threading.Lock()
+        self._last_slot = float('-inf')
+
+    def __bool__(self) -> bool:
+        """
+        True when at least one quota is configured
+        """
+        return bool(self.buckets)
+
+    @property
+    def window(self) -> float:
+        """
+        Longest quota period, in seconds (0 without quotas)
+        """
+        return max((period for _, period, _ in self.buckets), default=0)
+
+    def seed(self, times: Iterable[float], wall_clock: Callable[[], float] = time.time):
+        """
+        Spend the tokens of sends made before this limiter was created
+
+        Args:
+            times: Wall-clock times of the earlier sends, oldest first
+            wall_clock: Clock the times were taken with
+        """
+        with self._lock:
+            # Past sends are placed on the monotonic clock of the limiter
+            offset = self.clock() - wall_clock()
+            now = self.clock()
+            for sent_at in times:
+                slot = sent_at + offset
+                for _, period, sends in self.buckets:
+                    if now - period < slot <= now:
+                        sends.append(slot)
+
+    def reserve(self) -> float:
+        """
+        Book the earliest send slot allowed by every quota
+
+        Returns:
+            Seconds to wait before sending (0 if a token is available now)
+        """
+        with self._lock:
+            now = self.clock()
+            slot = max(now, self._last_slot)
+            for limit, period, sends in self.buckets:
+                if len(sends) == limit:
+                    # The oldest of the last `limit` sends must leave the window first
+                    slot = max(slot, sends[0] + period)
+            for _, _, sends in self.buckets:
+                sends.append(slot)
+            self._last_slot = slot
+            return slot - now
+
+    def acquire(self):
+        """
+        Wait until an email may be sent
+        """
+        delay = self.reserve()
+        if delay > 0:
+            if delay >= 1:
+                logger.info(f"⏳ Sending quota reached, waiting {delay:.0f}s...")
+            self.sleep(delay)
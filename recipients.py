@@ -0,0 +1,257 @@
+"""
+Recipients
+Compact records of the members read from a `name,mailSesame,mailAutre` CSV
+and a RecipientSet indexing them by email address, compared without case.
+"""
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+def normalize_address(address: str) -> str:
+    """
+    Key of an email address: trimmed and lowercased (the same string is
+    returned when it already is, so no copy is kept)
+    """
+    key = address.strip().lower()
+    return address if key == address else key
+
+
+class Recipient:
+    __slots__ = ('name', 'mail_sesame', 'mail_autre')
+
+    def __init__(self, name: str, mail_sesame: str, mail_autre: Optional[str] = None):
+        """
+        One member of a CSV
+
+        Unpacks like the (name, mailSesame, mailAutre) tuples it replaces.
+
+        Args:
+            name: Member name
+            mail_sesame: Sesame email address
+            mail_autre: Other email address, if any
+        """
+        self.name = name
+        self.mail_sesame = mail_sesame
+        self.mail_autre = mail_autre
+
+    @property
+    def addresses(self) -> List[str]:
+        """
+        Email addresses the member is sent to
+        """
+        return [self.mail_sesame, self.mail_autre] if self.mail_autre else [self.mail_sesame]
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        yield self.name
+        yield self.mail_sesame
+        yield self.mail_autre
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Recipient, tuple)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        # Equal to the tuple it compares equal to
+        return hash(tuple(self))
+
+    def __repr__(self) -> str:
+        return f"Recipient({self.name!r}, {self.mail_sesame!r}, {self.mail_autre!r})"
+
+
+class RecipientSet:
+    def __init__(self, recipients: Iterable[Recipient] = ()):
+        """
+        Recipients in CSV order, one per Sesame address, indexed by address
+
+        Records are packed as UTF-8 in a single buffer (Recipient objects are
+        only created when read back) and the address index maps the hash of
+        each address to a record number, without keeping the address strings,
+        so a member costs less than half the memory of a tuple of strings plus
+        a dict entry per address.
+
+        Args:
+            recipients: Records to add (duplicates are dropped)
+        """
+        self._data = bytearray()
+        # Start of every record in _data, the end of the last one appended
+        self._offsets = array('Q', [0])
+        # Byte lengths of the name and Sesame address of every record (the
+        # other address takes the rest), so any character can be stored
+        self._lengths = array('I')
+        # Address index: hash of the normalized address -> record number of
+        # the first record using it. The few addresses whose hash is taken by
+        # another address, or whose entry moved to a later record, are
+        # indexed by their string instead (looked up first).
+        self._index: Dict[int, int] = {}
+        self._by_address: Dict[str, int] = {}
+        # Addresses of the duplicate rows merged into a record: normalized
+        # address -> (record number, address as read)
+        self._merged: Dict[str, Tuple[int, str]] = {}
+        for recipient in recipients:
+            self.add(recipient)
+
+    def _fields(self, row: int) -> List[str]:
+        start = self._offsets[row]
+        name_end = start + self._lengths[2 * row]
+        sesame_end = name_end + self._lengths[2 * row + 1]
+        data = self._data
+        return [data[start:name_end].decode('utf-8'), data[name_end:sesame_end].decode('utf-8'),
+                data[sesame_end:self._offsets[row + 1]].decode('utf-8')]
+
+    def _address_fields(self, row: int) -> List[bytes]:
+        """
+        Encoded Sesame and other address of a record (empty if none)
+        """
+        sesame_start = self._offsets[row] + self._lengths[2 * row]
+        sesame_end = sesame_start + self._lengths[2 * row + 1]
+        return [self._data[sesame_start:sesame_end], self._data[sesame_end:self._offsets[row + 1]]]
+
+    def _uses(self, row: int, key: str) -> bool:
+        """
+        Check whether a record uses a normalized address
+        """
+        fields = self._address_fields(row)
+        # Addresses are mostly stored normalized already: compare the bytes first
+        if key.encode('utf-8') in fields:
+            return True
+        return any(normalize_address(field.decode('utf-8')) == key for field in fields if field)
+
+    def _lookup(self, key: str, key_hash: int) -> int:
+        """
+        Record number using a normalized address, or -1
+        """
+        if self._by_address:
+            row = self._by_address.get(key, -1)
+            if row != -1:
+                return row
+        row = self._index.get(key_hash, -1)
+        # Stored fields are only read when the hash is known
+        if row == -1 or self._uses(row, key):
+            return row
+        return -1
+
+    def _index_key(self, key: str, key_hash: int, row: int, replace: bool = False):
+        known = self._index.get(key_hash, -1)
+        if known == -1:
+            self._index[key_hash] = row
+        elif replace or (key not in self._by_address and not self._uses(known, key)):
+            # The hash entry may stand for other addresses of its record too
+            self._by_address[key] = row
+
+    def _find(self, address: str) -> int:
+        """
+        Record number using an address, or -1
+        """
+        key = normalize_address(address)
+        return self._lookup(key, hash(key))
+
+    def add(self, recipient: Recipient) -> bool:
+        """
+        Add a record unless its Sesame address is already in the set
+
+        Returns:
+            True if the record was added
+        """
+        index = self._index
+        key = normalize_address(recipient.mail_sesame)
+        key_hash = hash(key)
+        known = index.get(key_hash, -1)
+        if known != -1:
+            known = self._lookup(key, key_hash)
+            # The address may already be known as another member's other address
+            if known != -1 and normalize_address(self._address_fields(known)[0].decode('utf-8')) == key:
+                return False
+
+        row = len(self._offsets) - 1
+        name = recipient.name.encode('utf-8')
+        mail_sesame = recipient.mail_sesame.encode('utf-8')
+        mail_autre = recipient.mail_autre
+        data = self._data
+        data += name
+        data += mail_sesame
+        if mail_autre:
+            data += mail_autre.encode('utf-8')
+        self._offsets.append(len(data))
+        self._lengths.append(len(name))
+        self._lengths.append(len(mail_sesame))
+        if known == -1 and key_hash not in index:
+            index[key_hash] = row
+        else:
+            self._index_key(key, key_hash, row, replace=True)
+        if mail_autre:
+            key = normalize_address(mail_autre)
+            key_hash = hash(key)
+            if key_hash not in index:
+                index[key_hash] = row
+            else:
+                self._index_key(key, key_hash, row)
+        return True
+
+    def merge(self, recipient: Recipient) -> List[str]:
+        """
+        Keep the new addresses of a row whose Sesame address is already in the
+        set, so they are sent the emails addressed to every member
+
+        Returns:
+            Addresses merged into the record of the Sesame address
+        """
+        row = self._find(recipient.mail_sesame)
+        merged = []
+        for address in recipient.addresses:
+            key = normalize_address(address)
+            if key not in self._merged and self._find(address) == -1:
+                self._merged[key] = (row, address)
+                merged.append(address)
+        return merged
+
+    def get(self, address: str) -> Optional[Recipient]:
+        """
+        Record using an email address (Sesame or other), whatever its case
+        """
+        row = self._find(address)
+        return self[row] if row != -1 else None
+
+    def addresses(self, merged: bool = True) -> Iterator[str]:
+        """
+        Every distinct email address, in CSV order
+
+        Args:
+            merged: Include the addresses merged from duplicate rows
+        """
+        extras: Dict[int, List[str]] = {}
+        if merged:
+            for row, address in self._merged.values():
+                extras.setdefault(row, []).append(address)
+        for row in range(len(self)):
+            for field in self._address_fields(row):
+                if not field:
+                    continue
+                address = field.decode('utf-8')
+                key = normalize_address(address)
+                key_hash = hash(key)
+                # Only the record the index points to yields a shared address
+                if self._index.get(key_hash) == row and key not in self._by_address \
+                        or self._lookup(key, key_hash) == row:
+                    yield address
+            # Unless a later record uses them
+            for address in extras.get(row, ()):
+                if self._find(address) == -1:
+                    yield address
+
+    def __contains__(self, address: str) -> bool:
+        return self._find(address) != -1
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __iter__(self) -> Iterator[Recipient]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def __getitem__(self, row: int) -> Recipient:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("recipient index out of range")
+        name, mail_sesame, mail_autre = self._fields(row)
+        return Recipient(name, mail_sesame, mail_autre or None)
@@ -0,0 +1,95 @@
+"""
+Retry policy for SMTP sends
+Classifies SMTP errors as transient (worth retrying: 4xx replies, dropped
+connections, timeouts) or permanent (5xx replies, bad configuration) and
+computes jittered exponential backoff delays.
+"""
+import random
+import smtplib
+from typing import Optional
+
+
+def _reply_code(error: Exception) -> Optional[int]:
+    """
+    SMTP reply code carried by an exception (smtplib or aiosmtplib), if any
+    """
+    code = getattr(error, 'smtp_code', None)
+    if code is None:
+        code = getattr(error, 'code', None)
+    return code if isinstance(code, int) else None
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Check whether a failed send may succeed if retried later
+
+    Args:
+        error: Exception raised while sending
+
+    Returns:
+        True for 4xx replies (421 busy, 451 greylisting, 452, 454...),
+        disconnections and network errors; False for 5xx replies and
+        other errors
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        # Retry only if every refusal is temporary
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(400 <= code < 500 for code in codes)
+
+    # aiosmtplib reports refused recipients as a list of exceptions
+    refused = getattr(error, 'recipients', None)
+    if isinstance(refused, list) and refused and all(isinstance(r, Exception) for r in refused):
+        return all(is_transient(r) for r in refused)
+
+    code = _reply_code(error)
+    if code is not None:
+        return 400 <= code < 500
+
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if type(error).__name__ in ('SMTPServerDisconnected', 'SMTPConnectError', 'SMTPTimeoutError', 'SMTPReadTimeoutError'):
+        return True
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    # Connection refused/reset, timeouts, DNS failures...
+    return isinstance(error, OSError)
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 4, base_delay: float = 5.0, max_delay: float = 300.0):
+        """
+        Initialize the retry policy
+
+        Args:
+            max_attempts: Total attempts per email, including the first one
+                (1 disables retries)
+            base_delay: Backoff before the first retry, in seconds
+            max_delay: Upper bound of the backoff, in seconds
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        """
+        Check whether a failed attempt should be retried
+
+        Args:
+            error: Exception raised by the attempt
+            attempt: Number of the attempt that failed (1 for the first)
+        """
+        return attempt < self.max_attempts and is_transient(error)
+
+    def delay(self, attempt: int) -> float:
+        """
+        Backoff before the next attempt, with jitter so retries of many
+        recipients do not hit the server at the same moment
+
+        Args:
+            attempt: Number of the attempt that failed (1 for the first)
+
+        Returns:
+            Seconds to wait, between half and all of the exponential backoff
+        """
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return backoff / 2 + random.uniform(0, backoff / 2)
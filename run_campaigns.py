@@ -0,0 +1,99 @@
+"""
+Campaign Runner
+Sends the campaigns listed in a manifest (campaigns.toml by default) in one
+run: each CSV is read once and the emails of all campaigns share the same SMTP
+sessions. With --test, every campaign goes to test.csv with a TEST subject.
+"""
+import argparse
+import os
+from main import EmailSender, credentials_missing, load_config, load_sender_options
+from manifest import load_manifest
+
+TEST_CSV = "test.csv"
+TEST_PREFIX = "🧪 TEST - "
+
+def main():
+    parser = argparse.ArgumentParser(description="Send the campaigns of a manifest over shared SMTP sessions")
+    parser.add_argument('manifest', nargs='?', default="campaigns.toml",
+                        help="Campaign manifest, .toml or .yaml (default: campaigns.toml)")
+    parser.add_argument('--only', nargs='+', metavar='CSV',
+                        help="Only send the campaigns of these CSV files")
+    parser.add_argument('--test', action='store_true',
+                        help=f"Send every campaign to {TEST_CSV} with a TEST subject")
+    parser.add_argument('--coalesce', action='store_true',
+                        help="Send campaigns with the same non-personalized email once per address, in Bcc batches")
+    parser.add_argument('--plan', action='store_true',
+                        help="Only report how the campaigns' recipients overlap, send nothing")
+    parser.add_argument('--preview', metavar='PATH',
+                        help="Write the emails to PATH (a .mbox file, or a directory of .eml files) "
+                             "instead of sending them")
+    args = parser.parse_args()
+    
+    print(f"=== {'🧪 TEST - ' if args.test else ''}📧 Campaign Runner ===\n")
+    
+    # Load configuration
+    smtp_server, smtp_port, sender_email, sender_password = load_config()
+    
+    if credentials_missing(sender_email, sender_password):
+        print("⚠️  CONFIGURATION NEEDED:")
+        print("Please ensure your .env file contains email credentials")
+        return
+    
+    try:
+        campaigns = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return
+    
+    if args.only:
+        campaigns = [campaign for campaign in campaigns if campaign.csv in args.only]
+    if args.test:
+        for campaign in campaigns:
+            campaign.csv = TEST_CSV
+            campaign.subject_prefix = TEST_PREFIX
+            campaign.name = f"test:{campaign.name}"
+    
+    print(f"📧 Using email: {sender_email}")
+    print(f"🌐 SMTP server: {smtp_server}:{smtp_port}")
+    print(f"📋 {len(campaigns)} campaign(s) from {args.manifest}:")
+    for campaign in campaigns:
+        print(f"   - {campaign.subject} ({campaign.mode}): {campaign.csv} with {campaign.template}")
+    
+    # Check the files of every campaign before sending anything
+    missing = sorted({path for campaign in campaigns for path in (campaign.csv, campaign.template)
+                      if not os.path.exists(path)})
+    if missing:
+        print(f"❌ Not found: {', '.join(missing)}")
+        return
+    if not campaigns:
+        print("Nothing to send.")
+        return
+    
+    # One sender for the whole run, its SMTP sessions and caches are shared
+    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password, **load_sender_options(args.preview))
+    
+    if args.plan:
+        print()
+        print(email_sender.plan_campaigns(campaigns).report())
+        email_sender.close()
+        return
+    
+    # Ask for confirmation
+    if args.preview:
+        print(f"\n📝 Preview mode: emails are written to {args.preview}, nothing is sent")
+    else:
+        response = input("\n🚀 Ready to send these campaigns? (y/n): ").lower().strip()
+        if response != 'y':
+            print("Operation cancelled.")
+            email_sender.close()
+            return
+    
+    try:
+        email_sender.send_campaigns(campaigns, coalesce=args.coalesce)
+    finally:
+        email_sender.close()
+    
+    print("\n✅ All campaigns processed!")
+
+if __name__ == "__main__":
+    main()
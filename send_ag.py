@@ -3,15 +3,17 @@ Convocation Email Sender for AG (Assemblée Générale)
 Sends convocation emails to all members from all.csv
 """
 import os
-from main import EmailSender, load_config
+from main import EmailSender, credentials_missing, load_config, load_sender_options, parse_script_args
 
 def main():
+    args = parse_script_args("Send the AG convocation to all members of all.csv")
+    
     print("=== 📧 AG Convocation - Email Sender ===\n")
     
     # Load configuration
     smtp_server, smtp_port, sender_email, sender_password = load_config()
     
-    if not sender_email or not sender_password:
+    if credentials_missing(sender_email, sender_password):
         print("⚠️  CONFIGURATION NEEDED:")
         print("Please ensure your .env file contains email credentials")
         return
@@ -30,18 +32,22 @@ def main():
         return
     
     # Ask for confirmation
-    response = input("\n🚀 Ready to send AG convocation emails to all members? (y/n): ").lower().strip()
-    if response != 'y':
-        print("Operation cancelled.")
-        return
+    if args.preview:
+        print(f"\n📝 Preview mode: emails are written to {args.preview}, nothing is sent")
+    else:
+        response = input("\n🚀 Ready to send AG convocation emails to all members? (y/n): ").lower().strip()
+        if response != 'y':
+            print("Operation cancelled.")
+            return
     
     # Initialize email sender and send bulk email to all members
-    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password)
+    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password, **load_sender_options(args.preview))
     email_sender.send_bulk_email(
         csv_file="all.csv",
         template_file="ConvocationAGetVisite.txt",
         subject_suffix="Convocation - AG et Visite CTJE"
     )
+    email_sender.close()
     
     print("\n✅ AG Convocation emails processed!")
 
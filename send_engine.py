@@ -0,0 +1,245 @@
+"""
+Parallel send engine
+Runs send jobs on a pool of worker threads (one SMTP session each), logs
+the lines of each recipient together, retries transient failures without
+holding up the rest of the queue, and aggregates the outcome of a campaign
+into a CampaignResult.
+"""
+import heapq
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, List, Optional
+
+from metrics import Metrics
+from retry import RetryPolicy
+from send_logging import logger
+
+
+class SendJob:
+    __slots__ = ('name', 'recipients', 'subject', 'message', 'pole', 'html', 'bcc', 'include_cc',
+                 'data', 'envelope', 'campaign')
+
+    def __init__(self, name: str, recipients: List[str], subject: str, message: str, pole: str,
+                 html: Optional[str] = None, bcc: bool = False, include_cc: bool = True,
+                 data: Optional[bytes] = None, envelope: Optional[List[str]] = None,
+                 campaign: Optional[str] = None):
+        """
+        One email to send
+
+        Args:
+            name: Recipient name (used for logging and the Message-ID)
+            recipients: Email addresses of the recipient
+            subject: Email subject
+            message: Personalized plain text body
+            pole: Pole name for styling
+            html: Pre-rendered HTML body (rendered from message if omitted)
+            bcc: Keep recipients out of the headers (To shows the sender)
+            include_cc: Copy the CC list on this email
+            data: Already serialized message (rendered from the fields above
+                if omitted)
+            envelope: Envelope recipients of `data`, CC included
+            campaign: Journal name of the campaign, when jobs of several
+                campaigns are sent together
+        """
+        self.name = name
+        self.recipients = recipients
+        self.subject = subject
+        self.message = message
+        self.pole = pole
+        self.html = html
+        self.bcc = bcc
+        self.include_cc = include_cc
+        self.data = data
+        self.envelope = envelope
+        self.campaign = campaign
+
+
+class SendResult:
+    __slots__ = ('name', 'recipients', 'success', 'error', 'log_lines', 'transient', 'attempts', 'campaign')
+
+    def __init__(self, name: str, recipients: List[str], success: bool,
+                 error: Optional[str] = None, log_lines: Optional[List[str]] = None,
+                 transient: bool = False):
+        """
+        Outcome of one send job
+
+        Args:
+            name: Recipient name
+            recipients: Email addresses the job was sent to
+            success: True if the server accepted the message
+            error: Error message when the send failed
+            log_lines: Lines describing the send, logged together
+            transient: True if the failure may succeed when retried
+        """
+        self.name = name
+        self.recipients = recipients
+        self.success = success
+        self.error = error
+        self.log_lines = log_lines or []
+        self.transient = transient
+        self.attempts = 1
+        self.campaign = None
+
+
+def log_result(result: SendResult, retrying: bool = False):
+    """
+    Log the lines of a send as one message, with its outcome as fields
+
+    Args:
+        result: Outcome of the send
+        retrying: The failure will be retried (logged as a warning)
+    """
+    if not result.log_lines:
+        return
+    if result.success:
+        level, event = logging.INFO, 'sent'
+    elif retrying:
+        level, event = logging.WARNING, 'retry'
+    else:
+        level, event = logging.ERROR, 'failed'
+    logger.log(level, '\n'.join(result.log_lines), extra={
+        'event': event, 'recipient_name': result.name, 'recipients': result.recipients,
+        'error': result.error, 'attempt': result.attempts,
+    })
+
+
+class CampaignResult:
+    def __init__(self, label: str = ""):
+        """
+        Aggregated outcome of a campaign
+
+        Args:
+            label: Campaign description (e.g. the CSV file)
+        """
+        self.label = label
+        self.results: List[SendResult] = []
+
+    def add(self, result: SendResult):
+        self.results.append(result)
+
+    @property
+    def sent(self) -> List[SendResult]:
+        return [r for r in self.results if r.success]
+
+    @property
+    def failed(self) -> List[SendResult]:
+        return [r for r in self.results if not r.success]
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __bool__(self) -> bool:
+        """
+        True when every send of the campaign succeeded
+        """
+        return all(r.success for r in self.results)
+
+    def summary(self, unit: str = "email(s)") -> str:
+        """
+        One line summary of the campaign
+
+        Args:
+            unit: What one result stands for (e.g. "batch(es)")
+        """
+        failed = len(self.failed)
+        text = f"{self.label}: {len(self.results) - failed}/{len(self.results)} {unit} sent"
+        if failed:
+            text += f", {failed} failed ({', '.join(r.name for r in self.failed[:5])}{'...' if failed > 5 else ''})"
+        return text
+
+
+class SendEngine:
+    def __init__(self, workers: int = 1, window: Optional[int] = None,
+                 retry_policy: Optional[RetryPolicy] = None, metrics: Optional[Metrics] = None):
+        """
+        Initialize the engine
+
+        Args:
+            workers: Number of sends running at the same time
+            window: Maximum number of sends submitted at once
+                (defaults to twice the worker count)
+            retry_policy: Backoff for transient failures (None disables retries)
+            metrics: Counters of sent and failed jobs and retries
+        """
+        self.workers = max(1, workers)
+        self.window = window or self.workers * 2
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=1)
+        self.metrics = metrics or Metrics()
+
+    def run(self, jobs: Iterable, send: Callable[[object], SendResult], label: str = "") -> CampaignResult:
+        """
+        Send every job and collect the results
+
+        Jobs are consumed lazily, so a generator can feed the engine while it
+        sends. The log lines of each job are logged together, in job order,
+        as soon as every earlier job is done (a retry is announced right
+        away). A job failing with a transient error waits for its retry in a
+        schedule while the next jobs keep being sent.
+
+        Args:
+            jobs: Iterable of jobs passed to `send`
+            send: Callable sending one job; must return a SendResult, not raise
+            label: Campaign description for the result summary
+
+        Returns:
+            CampaignResult with one SendResult per job, in job order
+        """
+        jobs = iter(jobs)
+        jobs_left = True
+        results = {}
+        # Retries waiting for their time: (due time, job index, job, attempt)
+        retries = []
+        in_flight = {}
+        next_index = 0
+        next_to_log = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                # Keep the workers busy: due retries first, then new jobs
+                while len(in_flight) < self.window:
+                    if retries and retries[0][0] <= time.monotonic():
+                        _, index, job, attempt = heapq.heappop(retries)
+                    elif jobs_left:
+                        job = next(jobs, None)
+                        if job is None:
+                            jobs_left = False
+                            continue
+                        index, attempt = next_index, 1
+                        next_index += 1
+                    else:
+                        break
+                    in_flight[executor.submit(send, job)] = (index, job, attempt)
+
+                if not in_flight:
+                    if not retries:
+                        break
+                    time.sleep(max(0.0, retries[0][0] - time.monotonic()))
+                    continue
+
+                timeout = max(0.0, retries[0][0] - time.monotonic()) if retries else None
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, job, attempt = in_flight.pop(future)
+                    result = future.result()
+                    result.attempts = attempt
+                    retrying = not result.success and result.transient and attempt < self.retry_policy.max_attempts
+                    if retrying:
+                        log_result(result, retrying)
+                        delay = self.retry_policy.delay(attempt)
+                        logger.warning(f"⏳ Temporary failure for {result.name}, retrying in {delay:.0f}s "
+                              f"(attempt {attempt + 1}/{self.retry_policy.max_attempts})")
+                        heapq.heappush(retries, (time.monotonic() + delay, index, job, attempt + 1))
+                        self.metrics.count('retries')
+                    else:
+                        results[index] = result
+                        self.metrics.count('sent' if result.success else 'failed')
+                # Log in job order as soon as earlier jobs are done
+                while next_to_log in results:
+                    log_result(results[next_to_log])
+                    next_to_log += 1
+
+        campaign = CampaignResult(label)
+        for index in sorted(results):
+            campaign.add(results[index])
+        return campaign
@@ -0,0 +1,135 @@
+"""
+Send logging
+Logging setup of the sender: every message goes through the `autosender`
+logger to a queue, and a background thread writes it to the console, so a
+slow terminal never holds up the sending. Messages are written as today's
+human-readable lines or as JSON lines (LOG_FORMAT=json).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import Optional
+
+logger = logging.getLogger('autosender')
+
+# Attributes of every LogRecord, the others come from `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue: Optional[queue.Queue] = None
+
+
+class HumanFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        The message alone, as the scripts have always printed it
+        """
+        return record.getMessage()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        One JSON object per message, with the fields passed in `extra`
+        """
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage().strip(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """
+    Handler writing to the current sys.stdout (which may be redirected later)
+    """
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def setup_logging(level: str = 'INFO', fmt: str = 'human', stream=None) -> logging.Logger:
+    """
+    Send the sender's messages through a queue to a console (or stream) writer
+
+    Args:
+        level: Minimum level written (DEBUG, INFO, WARNING, ERROR)
+        fmt: 'human' for the usual lines, 'json' for JSON lines
+        stream: Stream to write to (defaults to the current sys.stdout)
+
+    Returns:
+        The `autosender` logger
+    """
+    global _listener, _queue
+    stop_logging()
+
+    handler = logging.StreamHandler(stream) if stream is not None else _StdoutHandler()
+    handler.setFormatter(JsonFormatter() if fmt.lower() == 'json' else HumanFormatter())
+
+    _queue = queue.Queue()
+    _listener = logging.handlers.QueueListener(_queue, handler)
+    _listener.start()
+
+    for old in list(logger.handlers):
+        logger.removeHandler(old)
+    logger.addHandler(logging.handlers.QueueHandler(_queue))
+    logger.setLevel(level.upper())
+    logger.propagate = False
+    return logger
+
+
+def ensure_logging() -> logging.Logger:
+    """
+    Set up logging from LOG_LEVEL and LOG_FORMAT unless it already is
+    """
+    if _listener is None and not logger.handlers:
+        setup_logging(os.getenv('LOG_LEVEL', 'INFO'), os.getenv('LOG_FORMAT', 'human'))
+    return logger
+
+
+def flush_logging():
+    """
+    Wait until every queued message is written
+    """
+    if _queue is not None and _listener is not None:
+        _queue.join()
+
+
+def stop_logging():
+    """
+    Write the queued messages and stop the writer thread
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _forget_after_fork():
+    # The writer thread does not survive a fork (render processes): start over
+    global _listener, _queue
+    _listener = None
+    _queue = None
+    for old in list(logger.handlers):
+        logger.removeHandler(old)
+
+
+atexit.register(stop_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_after_fork)
@@ -3,15 +3,17 @@ Meeting Announcement Sender
 Sends meeting announcements to Projet members from Projet.csv
 """
 import os
-from main import EmailSender, load_config
+from main import EmailSender, credentials_missing, load_config, load_sender_options, parse_script_args
 
 def main():
+    args = parse_script_args("Send the meeting announcement to the Projet members of Projet.csv")
+    
     print("=== Meeting Announcement - Email Sender ===\n")
     
     # Load configuration
     smtp_server, smtp_port, sender_email, sender_password = load_config()
     
-    if not sender_email or not sender_password:
+    if credentials_missing(sender_email, sender_password):
         print("⚠️  CONFIGURATION NEEDED:")
         print("Please ensure your .env file contains email credentials")
         return
@@ -30,20 +32,24 @@ def main():
         return
     
     # Ask for confirmation
-    response = input("\nReady to send meeting announcement to Projet members? (y/n): ").lower().strip()
-    if response != 'y':
-        print("Operation cancelled.")
-        return
+    if args.preview:
+        print(f"\n📝 Preview mode: emails are written to {args.preview}, nothing is sent")
+    else:
+        response = input("\nReady to send meeting announcement to Projet members? (y/n): ").lower().strip()
+        if response != 'y':
+            print("Operation cancelled.")
+            return
     
     print("\nStarting bulk meeting announcement...\n")
     
     # Initialize email sender and send bulk email
-    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password)
+    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password, **load_sender_options(args.preview))
     email_sender.send_bulk_email(
         csv_file="Projet.csv",
         template_file="MeetingAnnouncement.txt",
         subject_suffix="Réunion Pôle Projet - Ce soir 20h00"
     )
+    email_sender.close()
     
     print("\nMeeting announcement sent!")
 
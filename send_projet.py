@@ -3,15 +3,17 @@ Welcome Email Sender for Projet Pole
 Sends welcome emails to new Projet members from Projet.csv
 """
 import os
-from main import EmailSender, load_config
+from main import EmailSender, credentials_missing, load_config, load_sender_options, parse_script_args
 
 def main():
+    args = parse_script_args("Send welcome emails to the Projet members of Projet.csv")
+    
     print("=== 📧 Projet - Welcome Email Sender ===\n")
     
     # Load configuration
     smtp_server, smtp_port, sender_email, sender_password = load_config()
     
-    if not sender_email or not sender_password:
+    if credentials_missing(sender_email, sender_password):
         print("⚠️  CONFIGURATION NEEDED:")
         print("Please ensure your .env file contains email credentials")
         return
@@ -30,18 +32,22 @@ def main():
         return
     
     # Ask for confirmation
-    response = input("\n🚀 Ready to send Projet welcome emails? (y/n): ").lower().strip()
-    if response != 'y':
-        print("Operation cancelled.")
-        return
+    if args.preview:
+        print(f"\n📝 Preview mode: emails are written to {args.preview}, nothing is sent")
+    else:
+        response = input("\n🚀 Ready to send Projet welcome emails? (y/n): ").lower().strip()
+        if response != 'y':
+            print("Operation cancelled.")
+            return
     
     # Initialize email sender and send
-    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password)
+    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password, **load_sender_options(args.preview))
     email_sender.process_csv_and_send(
         csv_file="Projet.csv",
         template_file="templateProjet.txt",
         subject_suffix="Pole Projet"
     )
+    email_sender.close()
     
     print("\n✅ Projet emails processed!")
 
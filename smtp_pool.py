@@ -0,0 +1,190 @@
+"""
+SMTP connection pool
+Keeps authenticated SMTP sessions open for a whole campaign and hands them
+out to EmailSender so that TCP, STARTTLS and AUTH happen once per session
+instead of once per message.
+"""
+import smtplib
+import threading
+import time
+from typing import Callable, List, TypeVar
+
+T = TypeVar('T')
+
+
+def _session_survives(error: Exception) -> bool:
+    """
+    Check whether a session is still usable after a failed transaction
+
+    smtplib resets the transaction before raising refusals, so the session can
+    be reused unless the server announced it is closing (421).
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code != 421 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code != 421
+    return False
+
+
+class PooledConnection:
+    def __init__(self, server: smtplib.SMTP):
+        """
+        Wrap an open SMTP session with the bookkeeping the pool needs
+
+        Args:
+            server: Connected and authenticated SMTP session
+        """
+        self.server = server
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.message_count = 0
+
+    def close(self):
+        """
+        Close the session, ignoring errors from an already dead connection
+        """
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+
+class SMTPConnectionPool:
+    def __init__(self, connect: Callable[[], smtplib.SMTP], size: int = 1,
+                 max_messages_per_connection: int = 100, idle_timeout: float = 60.0):
+        """
+        Initialize the pool
+
+        Args:
+            connect: Callable returning a connected and authenticated SMTP session
+            size: Maximum number of sessions open at the same time
+            max_messages_per_connection: Messages sent before a session is recycled
+            idle_timeout: Seconds a session may sit idle before it is considered
+                closed by the server and reopened
+        """
+        self.connect = connect
+        self.size = max(1, size)
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_timeout = idle_timeout
+        self._idle: List[PooledConnection] = []
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._checked_out = 0
+        self.connections_opened = 0
+
+    def ensure_size(self, size: int):
+        """
+        Grow the pool so that at least `size` sessions can be used at once
+
+        Args:
+            size: Number of concurrent sessions needed (e.g. worker count)
+        """
+        with self._available:
+            if size > self.size:
+                self.size = size
+                self._available.notify_all()
+
+    def _is_stale(self, conn: PooledConnection) -> bool:
+        """
+        Check whether an idle session should be recycled instead of reused
+        """
+        if self.max_messages_per_connection and conn.message_count >= self.max_messages_per_connection:
+            return True
+        return time.monotonic() - conn.last_used > self.idle_timeout
+
+    def _open(self) -> PooledConnection:
+        conn = PooledConnection(self.connect())
+        with self._lock:
+            self.connections_opened += 1
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """
+        Take a session from the pool, opening a new one if none is usable
+
+        Blocks while `size` sessions are already checked out.
+        """
+        with self._available:
+            while self._checked_out >= self.size:
+                self._available.wait()
+            self._checked_out += 1
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._open()
+                if self._is_stale(conn):
+                    conn.close()
+                    continue
+                return conn
+        except Exception:
+            self._give_back()
+            raise
+
+    def _give_back(self):
+        with self._available:
+            self._checked_out -= 1
+            self._available.notify()
+
+    def release(self, conn: PooledConnection, broken: bool = False):
+        """
+        Return a session to the pool
+
+        Args:
+            conn: Session obtained from acquire()
+            broken: True if the session failed and must not be reused
+        """
+        try:
+            if broken or self._is_stale(conn):
+                conn.close()
+            else:
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._give_back()
+
+    def send(self, transaction: Callable[[smtplib.SMTP], T]) -> T:
+        """
+        Run a transaction on a pooled session, reconnecting once if the
+        server dropped a reused session (idle timeout, server restart...)
+
+        Args:
+            transaction: Callable performing MAIL/RCPT/DATA on the session
+
+        Returns:
+            What the transaction returned (sendmail(): the refused recipients)
+        """
+        conn = self.acquire()
+        reused = conn.message_count > 0
+        try:
+            result = transaction(conn.server)
+        except smtplib.SMTPServerDisconnected:
+            self.release(conn, broken=True)
+            if not reused:
+                raise
+            conn = self.acquire()
+            try:
+                result = transaction(conn.server)
+            except Exception as e:
+                self.release(conn, broken=not _session_survives(e))
+                raise
+        except Exception as e:
+            self.release(conn, broken=not _session_survives(e))
+            raise
+        conn.message_count += 1
+        conn.last_used = time.monotonic()
+        self.release(conn)
+        return result
+
+    def close(self):
+        """
+        Close every idle session
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
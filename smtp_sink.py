@@ -0,0 +1,170 @@
+"""
+Local SMTP sink
+Minimal in-process SMTP server that accepts and discards every email, used by
+benchmark.py to measure the sender without sending real mail. Commands may be
+pipelined; the sink counts round trips (each time it waits for the client
+after replying), so pipelining shows up in the measurements.
+"""
+import socketserver
+import threading
+from typing import List, Optional, Sequence
+
+DEFAULT_EXTENSIONS = ('AUTH PLAIN LOGIN', 'PIPELINING', '8BITMIME', 'SMTPUTF8')
+# Extensions of a server without pipelining nor 8-bit bodies
+BASIC_EXTENSIONS = ('AUTH PLAIN LOGIN',)
+READ_SIZE = 65536
+
+
+class _SinkHandler(socketserver.BaseRequestHandler):
+    def setup(self):
+        self._buffer = bytearray()
+        self._replies: List[bytes] = []
+
+    def _reply(self, line: bytes):
+        self._replies.append(line + b"\r\n")
+
+    def _flush(self):
+        self.request.sendall(b"".join(self._replies))
+        self._replies = []
+
+    def _receive(self) -> bool:
+        """
+        Read more of the client's data, counting a round trip if the client
+        was waiting for our replies
+
+        Replies are sent together just before waiting (RFC 2920), so the
+        replies to pipelined commands go in one packet.
+        """
+        if self._replies:
+            self._flush()
+            self.server.sink._count('round_trips')
+        chunk = self.request.recv(READ_SIZE)
+        self._buffer += chunk
+        return bool(chunk)
+
+    def _read_until(self, terminator: bytes) -> bytes:
+        """
+        Data up to and including the terminator (b'' if the client left)
+        """
+        while True:
+            end = self._buffer.find(terminator)
+            if end != -1:
+                end += len(terminator)
+                data = bytes(self._buffer[:end])
+                del self._buffer[:end]
+                return data
+            if not self._receive():
+                return b""
+
+    def _read_message(self) -> bytes:
+        """
+        Message data, up to the line holding a single period
+        """
+        while True:
+            if self._buffer.startswith(b".\r\n"):
+                del self._buffer[:3]
+                return b""
+            end = self._buffer.find(b"\r\n.\r\n")
+            if end != -1:
+                data = bytes(self._buffer[:end + 2])
+                del self._buffer[:end + 5]
+                return data
+            if not self._receive():
+                return b""
+
+    def handle(self):
+        sink = self.server.sink
+        sink._count('connections')
+        self._reply(b"220 sink ESMTP ready")
+        while True:
+            line = self._read_until(b"\n")
+            if not line:
+                return
+            sink._count('commands')
+            command = line.strip().upper()
+            verb = command.split(b' ', 1)[0].split(b':', 1)[0]
+
+            if verb == b'EHLO':
+                lines = [b"sink"] + [extension.encode('ascii') for extension in sink.extensions]
+                for extension in lines[:-1]:
+                    self._reply(b"250-" + extension)
+                self._reply(b"250 " + lines[-1])
+            elif verb == b'AUTH':
+                self._reply(b"235 2.7.0 Authentication successful")
+            elif verb == b'DATA':
+                self._reply(b"354 End data with <CR><LF>.<CR><LF>")
+                data = self._read_message()
+                sink._add_message(len(data), data if sink.keep_messages else None)
+                self._reply(b"250 2.0.0 Queued")
+            elif verb == b'QUIT':
+                self._reply(b"221 2.0.0 Bye")
+                self._flush()
+                return
+            else:
+                # HELO, MAIL, RCPT, RSET, NOOP...
+                self._reply(b"250 2.0.0 OK")
+
+
+class _SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 extensions: Sequence[str] = DEFAULT_EXTENSIONS, keep_messages: bool = False):
+        """
+        Initialize the sink (call start() to listen)
+
+        Args:
+            host: Address to listen on
+            port: Port to listen on (0 picks a free port)
+            extensions: ESMTP extensions advertised in the EHLO reply
+            keep_messages: Keep the received messages in self.messages
+                (only their count and size are kept otherwise)
+        """
+        self.host = host
+        self.port = port
+        self.extensions = list(extensions)
+        self.keep_messages = keep_messages
+        self.messages: List[bytes] = []
+        self.message_count = 0
+        self.bytes_received = 0
+        self.connections = 0
+        self.commands = 0
+        self.round_trips = 0
+        self._lock = threading.Lock()
+        self._server: Optional[_SinkServer] = None
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _add_message(self, size: int, message: Optional[bytes]):
+        with self._lock:
+            self.message_count += 1
+            self.bytes_received += size
+            if message is not None:
+                self.messages.append(message)
+
+    def start(self) -> 'SMTPSink':
+        """
+        Listen in a background thread
+        """
+        self._server = _SinkServer((self.host, self.port), _SinkHandler)
+        self._server.sink = self
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -3,7 +3,7 @@ TEST - Meeting Announcement
 Sends meeting announcement to test.csv recipients
 """
 import os
-from main import EmailSender, load_config
+from main import EmailSender, credentials_missing, load_config, load_sender_options
 
 def main():
     print("=== TEST - Meeting Announcement ===\n")
@@ -11,7 +11,7 @@ def main():
     # Load configuration
     smtp_server, smtp_port, sender_email, sender_password = load_config()
     
-    if not sender_email or not sender_password:
+    if credentials_missing(sender_email, sender_password):
         print("⚠️  CONFIGURATION NEEDED:")
         print("Please ensure your .env file contains email credentials")
         return
@@ -38,10 +38,13 @@ def main():
     print("\nStarting test bulk email sending...\n")
     
     # Initialize email sender
-    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password)
+    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password, **load_sender_options())
     
     # Read test recipients to show count
-    test_emails = email_sender.read_csv_emails("test.csv")
+    try:
+        test_emails = email_sender.read_csv_emails("test.csv")
+    finally:
+        email_sender.close()
     if not test_emails:
         print("No emails found in test.csv")
         return
@@ -91,12 +94,15 @@ def main():
             self.send_email(unique_recipients, subject, generic_message, subject_suffix, "all_test_members")
     
     # Use the test version
-    test_email_sender = TestEmailSender(smtp_server, smtp_port, sender_email, sender_password)
-    test_email_sender.send_bulk_email(
-        csv_file="test.csv",
-        template_file="MeetingAnnouncement.txt",
-        subject_suffix="Réunion Pôle Projet - Ce soir 20h00"
-    )
+    test_email_sender = TestEmailSender(smtp_server, smtp_port, sender_email, sender_password, **load_sender_options())
+    try:
+        test_email_sender.send_bulk_email(
+            csv_file="test.csv",
+            template_file="MeetingAnnouncement.txt",
+            subject_suffix="Réunion Pôle Projet - Ce soir 20h00"
+        )
+    finally:
+        test_email_sender.close()
     
     print(f"\nTest completed! Sent one bulk email to all {len(test_emails)} test recipients.")
 
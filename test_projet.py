@@ -3,7 +3,7 @@ TEST - Projet Welcome Emails
 Sends Projet welcome emails to test.csv recipients
 """
 import os
-from main import EmailSender, load_config
+from main import EmailSender, credentials_missing, load_config, load_sender_options
 
 def main():
     print("=== 🧪 TEST - Projet Welcome Emails ===\n")
@@ -11,7 +11,7 @@ def main():
     # Load configuration
     smtp_server, smtp_port, sender_email, sender_password = load_config()
     
-    if not sender_email or not sender_password:
+    if credentials_missing(sender_email, sender_password):
         print("⚠️  CONFIGURATION NEEDED:")
         print("Please ensure your .env file contains email credentials")
         return
@@ -38,7 +38,7 @@ def main():
     print("\n🚀 Starting test email sending...\n")
     
     # Initialize email sender
-    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password)
+    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password, **load_sender_options())
     
     # Read test recipients
     test_emails = email_sender.read_csv_emails("test.csv")
@@ -68,6 +68,8 @@ def main():
         print(f"📤 Sending Projet test email to {name}...")
         email_sender.send_email(recipients, subject, personalized_message, "Pole Projet", name)
     
+    email_sender.close()
+    
     print(f"\n✅ Test completed! Sent {len(test_emails)} test emails.")
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 import random
 import os
 from dotenv import load_dotenv
-from main import EmailSender, load_config
+from main import EmailSender, credentials_missing, load_config, load_sender_options
 
 def main():
     """
@@ -12,7 +12,7 @@ def main():
     # Load configuration
     smtp_server, smtp_port, sender_email, sender_password = load_config()
     
-    if not sender_email or not sender_password:
+    if credentials_missing(sender_email, sender_password):
         print("⚠️  CONFIGURATION NEEDED:")
         print("Please ensure your .env file contains email credentials")
         return
@@ -49,7 +49,7 @@ def main():
     print("\n🚀 Starting test email sending...\n")
     
     # Initialize email sender
-    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password)
+    email_sender = EmailSender(smtp_server, smtp_port, sender_email, sender_password, **load_sender_options())
     
     # Read test recipients
     test_emails = email_sender.read_csv_emails("test.csv")
@@ -88,6 +88,8 @@ def main():
         print(f"📤 Sending {template_file} to {name}...")
         email_sender.send_email(recipients, subject, personalized_message, subject_suffix, name)
     
+    email_sender.close()
+    
     print(f"\n✅ Test completed! Sent {len(test_emails)} test emails with random templates.")
 
 if __name__ == "__main__":
@@ -0,0 +1,44 @@
+"""
+Multi-campaign runs through AsyncEmailSender
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+pytest.importorskip('aiosmtplib')
+
+from async_sender import AsyncEmailSender  # noqa: E402
+from benchmark import write_csv  # noqa: E402
+from manifest import BULK, Campaign  # noqa: E402
+from smtp_sink import SMTPSink  # noqa: E402
+
+
+def test_send_campaigns_runs_a_manifest(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    members = str(tmp_path / 'members.csv')
+    write_csv(members, 6)
+    campaigns = [
+        Campaign(members, 'templateMC.txt', 'Pole Marketing Commercial'),
+        Campaign(members, 'ConvocationAGetVisite.txt', 'Convocation', mode=BULK, batch_size=4),
+    ]
+
+    async def run():
+        with SMTPSink() as sink:
+            sender = AsyncEmailSender(sink.host, sink.port, 'me@sesame.com.tn', 'pw', cc_list=[])
+            sender.transport.starttls = False
+            try:
+                results = await sender.send_campaigns(campaigns)
+            finally:
+                await sender.aclose()
+            return results, sink.message_count
+
+    results, delivered = asyncio.run(run())
+
+    # 6 personalized emails, then 9 addresses in Bcc batches of 4
+    assert [(len(result), len(result.sent)) for result in results] == [(6, 6), (3, 3)]
+    assert delivered == 9
@@ -0,0 +1,29 @@
+"""
+Serialization of the headers of rendered emails
+"""
+import email
+import email.policy
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import EmailSender  # noqa: E402
+
+
+def test_long_internationalized_recipient_list_is_folded(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    sender = EmailSender('localhost', 25, 'me@sesame.com.tn', 'pw', cc_list=[], eight_bit=False)
+    recipients = [f"élève{i}@école-supérieure.tn" for i in range(100)]
+    try:
+        data, envelope = sender.render_message(recipients, "Convocation", "Bonjour", "Convocation", "all_members")
+    finally:
+        sender.close()
+
+    headers = data.split(b'\r\n\r\n', 1)[0]
+    assert all(len(line) <= 998 for line in data.split(b'\r\n'))
+    assert max(len(line) for line in headers.split(b'\r\n')) <= 78
+    message = email.message_from_string(data.decode('utf-8'), policy=email.policy.SMTPUTF8)
+    assert [address.addr_spec for address in message['To'].addresses] == recipients
+    assert envelope == recipients
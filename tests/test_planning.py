@@ -0,0 +1,38 @@
+"""
+Recipients of a multi-campaign run
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import EmailSender  # noqa: E402
+from manifest import BULK, Campaign  # noqa: E402
+
+
+def test_plan_merges_repeated_rows_like_send_bulk_email(tmp_path):
+    members = tmp_path / 'members.csv'
+    members.write_text(
+        "name,mailSesame,mailAutre\n"
+        "Amine,amine@sesame.com.tn,amine@gmail.com\n"
+        "Amine,AMINE@sesame.com.tn,amine.b@yahoo.fr\n"
+        "Sarra,sarra@sesame.com.tn,\n"
+        "Sarra,sarra@sesame.com.tn,sarra@gmail.com\n"
+        "Youssef,youssef@sesame.com.tn,amine.b@yahoo.fr\n",
+        encoding='utf-8')
+    sender = EmailSender('localhost', 25, 'me@sesame.com.tn', 'pw', cc_list=[], eight_bit=False)
+    try:
+        bulk = Campaign(str(members), 'ConvocationAGetVisite.txt', 'Convocation', mode=BULK)
+        personal = Campaign(str(members), 'templateMC.txt', 'Pole Marketing Commercial')
+        plan = sender.plan_campaigns([bulk, personal])
+        recipients = plan.recipients[str(members)]
+
+        # Merged addresses follow the record of their member instead of their row
+        assert sorted(recipients.addresses()) == sorted(sender._bulk_recipients(str(members)))
+        assert len(recipients) == 3
+        # The personalized campaign only writes to the first row of each member
+        assert 'sarra@gmail.com' not in {address for recipient in recipients for address in recipient.addresses}
+        assert [campaign.subject for campaign in plan.campaigns_of('SARRA@gmail.com')] == ['Convocation']
+    finally:
+        sender.close()
@@ -0,0 +1,386 @@
+"""
+Transports
+How EmailSender hands rendered emails over: an SMTP session to the provider
+(STARTTLS on 587, the default, or implicit TLS on 465), an unauthenticated
+local relay (the MTA of the machine on localhost:25), LMTP, or files dropped
+in an MTA pickup directory. With a local relay or pickup directory, the
+campaign only waits for the local MTA, which queues the emails and handles
+the remote delivery and its retries.
+
+Every transport opens sessions for the connection pool: objects with the
+sendmail(), quit() and close() methods of smtplib.SMTP. The SMTP and LMTP
+sessions use ESMTP PIPELINING when the server advertises it (MAIL, RCPT and
+DATA in one round trip instead of one each) and declare BODY=8BITMIME or
+SMTPUTF8 when the message or an address needs it.
+"""
+import os
+import re
+import smtplib
+import threading
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+STARTTLS = 'starttls'  # SMTP with STARTTLS and login (default)
+SSL = 'ssl'            # SMTP over implicit TLS with login
+RELAY = 'relay'        # Local MTA, plain SMTP without login
+LMTP = 'lmtp'          # Local MTA or mail store over LMTP
+PICKUP = 'pickup'      # Files in the pickup directory of a local MTA
+TRANSPORTS = (STARTTLS, SSL, RELAY, LMTP, PICKUP)
+# Transports logging in with SENDER_PASSWORD
+AUTHENTICATED = (STARTTLS, SSL)
+
+# Lines of a message body starting with a period, doubled on the wire
+_PERIOD_LINES = re.compile(br'(?m)^\.')
+
+# Server used when SMTP_SERVER/SMTP_PORT are not set
+DEFAULT_SERVERS: Dict[str, Tuple[str, int]] = {
+    STARTTLS: ('smtp.gmail.com', 587),
+    SSL: ('smtp.gmail.com', 465),
+    RELAY: ('localhost', 25),
+    LMTP: ('localhost', smtplib.LMTP_PORT),
+    PICKUP: ('localhost', 25),
+}
+
+
+def accepts_8bit(session) -> bool:
+    """
+    Check whether a session takes 8-bit message bodies (8BITMIME), so the
+    text parts need no base64 encoding
+    """
+    if not isinstance(session, smtplib.SMTP):
+        return False
+    session.ehlo_or_helo_if_needed()
+    return session.has_extn('8bitmime')
+
+
+class _ESMTPSession:
+    """
+    sendmail() of smtplib sessions with PIPELINING and the BODY=8BITMIME and
+    SMTPUTF8 parameters (mixed into smtplib.SMTP and its subclasses)
+    """
+
+    def sendmail(self, from_addr: str, to_addrs: Union[str, List[str]], msg: bytes,
+                 mail_options: Sequence[str] = (), rcpt_options: Sequence[str] = ()) -> dict:
+        self.ehlo_or_helo_if_needed()
+        if isinstance(to_addrs, str):
+            to_addrs = [to_addrs]
+        mail_options = list(mail_options)
+        if isinstance(msg, bytes) and not msg.isascii():
+            if not self.has_extn('8bitmime'):
+                raise smtplib.SMTPNotSupportedError("8-bit message body and the server does not support 8BITMIME")
+            mail_options.append('BODY=8BITMIME')
+        if not ''.join([from_addr, *to_addrs]).isascii():
+            mail_options.append('SMTPUTF8')
+        if not self.has_extn('pipelining'):
+            return super().sendmail(from_addr, to_addrs, msg, mail_options, rcpt_options)
+        return self._pipelined(from_addr, to_addrs, msg, mail_options, list(rcpt_options))
+
+    def _fail(self, code: int):
+        # The server closes the session after a 421 reply
+        if code == 421:
+            self.close()
+        else:
+            self._rset()
+
+    def _data_replies(self, accepted: List[str]) -> Dict[str, Tuple[int, bytes]]:
+        """
+        Read the reply to the end of the message data
+
+        Returns:
+            Recipients refused at this point, with their reply
+        """
+        code, response = self.getreply()
+        if code != 250:
+            self._fail(code)
+            raise smtplib.SMTPDataError(code, response)
+        return {}
+
+    def _pipelined(self, from_addr: str, to_addrs: List[str], msg: bytes,
+                   mail_options: List[str], rcpt_options: List[str]) -> dict:
+        """
+        Send MAIL, every RCPT and DATA at once, then read their replies in
+        order (RFC 2920), so a transaction costs two round trips
+        """
+        if 'smtputf8' in (option.lower() for option in mail_options):
+            if not self.has_extn('smtputf8'):
+                raise smtplib.SMTPNotSupportedError("SMTPUTF8 not supported by server")
+            self.command_encoding = 'utf-8'
+        if self.has_extn('size'):
+            mail_options.append(f"SIZE={len(msg)}")
+        mail_parameters = ''.join(' ' + option for option in mail_options)
+        rcpt_parameters = ''.join(' ' + option for option in rcpt_options)
+        commands = [f"mail FROM:{smtplib.quoteaddr(from_addr)}{mail_parameters}\r\n"]
+        commands += [f"rcpt TO:{smtplib.quoteaddr(address)}{rcpt_parameters}\r\n" for address in to_addrs]
+        commands.append("data\r\n")
+        self.send(''.join(commands))
+
+        code, response = self.getreply()
+        refused = {}
+        for address in to_addrs:
+            reply = self.getreply()
+            if reply[0] not in (250, 251):
+                refused[address] = reply
+        data_code, data_response = self.getreply()
+
+        if data_code == 354 and (code != 250 or len(refused) == len(to_addrs)):
+            # A server accepting DATA without recipients gets an empty message
+            self.send(".\r\n")
+            self.getreply()
+        if code != 250:
+            self._fail(code)
+            raise smtplib.SMTPSenderRefused(code, response, from_addr)
+        if len(refused) == len(to_addrs):
+            self._fail(421 if any(reply[0] == 421 for reply in refused.values()) else 0)
+            raise smtplib.SMTPRecipientsRefused(refused)
+        if data_code != 354:
+            self._fail(data_code)
+            raise smtplib.SMTPDataError(data_code, data_response)
+
+        data = _PERIOD_LINES.sub(b'..', msg)
+        if not data.endswith(b'\r\n'):
+            data += b'\r\n'
+        self.send(data + b'.\r\n')
+        refused.update(self._data_replies([address for address in to_addrs if address not in refused]))
+        return refused
+
+
+class _SMTPSession(_ESMTPSession, smtplib.SMTP):
+    pass
+
+
+class _SMTPSSLSession(_ESMTPSession, smtplib.SMTP_SSL):
+    pass
+
+
+class SMTPTransport:
+    # Session class and security of the connection
+    session_class = _SMTPSession
+    starttls = True
+    implicit_tls = False
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None, password: Optional[str] = None):
+        """
+        SMTP server reached directly (STARTTLS, then login)
+
+        Args:
+            host: SMTP server address
+            port: SMTP port
+            username: Login (no AUTH without it or the password)
+            password: Password or app password
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+
+    def _session(self) -> smtplib.SMTP:
+        return self.session_class(self.host, self.port)
+
+    def connect(self, metrics) -> smtplib.SMTP:
+        """
+        Open a session ready to send
+
+        Args:
+            metrics: Metrics timing the connect, STARTTLS and AUTH phases
+        """
+        with metrics.timer('connect'):
+            server = self._session()
+        try:
+            if self.starttls:
+                with metrics.timer('starttls'):
+                    server.starttls()
+            if self.username and self.password:
+                with metrics.timer('auth'):
+                    server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def __str__(self) -> str:
+        security = " (STARTTLS)" if self.starttls else " (TLS)" if self.implicit_tls else ""
+        return f"SMTP {self.host}:{self.port}{security}"
+
+
+class SMTPSSLTransport(SMTPTransport):
+    """
+    SMTP server reached over implicit TLS (port 465), then login
+    """
+    session_class = _SMTPSSLSession
+    starttls = False
+    implicit_tls = True
+
+
+class RelayTransport(SMTPTransport):
+    starttls = False
+
+    def __init__(self, host: str = 'localhost', port: int = 25,
+                 username: Optional[str] = None, password: Optional[str] = None):
+        """
+        Local MTA accepting mail from this machine without TLS, nor login
+        unless credentials are given
+
+        Args:
+            host: Relay address
+            port: Relay port
+            username: Login, if the relay requires one
+            password: Password, if the relay requires one
+        """
+        super().__init__(host, port, username, password)
+
+    def __str__(self) -> str:
+        return f"local relay {self.host}:{self.port}"
+
+
+class _LMTPSession(_ESMTPSession, smtplib.LMTP):
+    """
+    LMTP session reading the reply per accepted recipient that follows DATA
+    (smtplib.LMTP reads a single one, which desynchronizes reused sessions)
+
+    Recipients refused after DATA are returned with the RCPT refusals, as
+    the message was delivered to the others.
+    """
+    _accepted: List[str] = []
+    _refused_at_data: Dict[str, Tuple[int, bytes]] = {}
+
+    def sendmail(self, from_addr: str, to_addrs: Union[str, List[str]], msg: bytes,
+                 mail_options: Sequence[str] = (), rcpt_options: Sequence[str] = ()) -> dict:
+        self._refused_at_data = {}
+        refused = super().sendmail(from_addr, to_addrs, msg, mail_options, rcpt_options)
+        refused.update(self._refused_at_data)
+        return refused
+
+    def mail(self, sender: str, options: Sequence[str] = ()):
+        self._accepted = []
+        return super().mail(sender, options)
+
+    def rcpt(self, recip: str, options: Sequence[str] = ()):
+        reply = super().rcpt(recip, options)
+        if reply[0] in (250, 251):
+            self._accepted.append(recip)
+        return reply
+
+    def data(self, msg):
+        code, response = super().data(msg)
+        self._refused_at_data = self._delivery_refusals(self._accepted, code, response)
+        # smtplib fails the whole email unless it sees a 250
+        return 250, response
+
+    def _data_replies(self, accepted: List[str]) -> Dict[str, Tuple[int, bytes]]:
+        code, response = self.getreply()
+        return self._delivery_refusals(accepted, code, response)
+
+    def _delivery_refusals(self, accepted: List[str], code: int, response: bytes) -> Dict[str, Tuple[int, bytes]]:
+        """
+        Read the delivery replies of the other accepted recipients (the first
+        one is given)
+
+        Raises:
+            SMTPRecipientsRefused: If no recipient got the message
+        """
+        replies = [(code, response)] + [self.getreply() for _ in accepted[1:]]
+        refused = {address: reply for address, reply in zip(accepted, replies) if reply[0] != 250}
+        if any(reply[0] == 421 for reply in refused.values()):
+            self.close()
+        if len(refused) == len(accepted):
+            raise smtplib.SMTPRecipientsRefused(refused)
+        return refused
+
+
+class LMTPTransport(SMTPTransport):
+    session_class = _LMTPSession
+    starttls = False
+
+    def __init__(self, host: str = 'localhost', port: int = smtplib.LMTP_PORT):
+        """
+        LMTP server (e.g. Postfix, Dovecot or Cyrus) without login or TLS
+
+        Args:
+            host: Server address, or the path of its Unix socket
+            port: Server port (ignored for a Unix socket)
+        """
+        super().__init__(host, port)
+
+    def __str__(self) -> str:
+        return f"LMTP {self.host}" if self.host.startswith('/') else f"LMTP {self.host}:{self.port}"
+
+
+class _PickupSession:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def sendmail(self, from_addr: str, to_addrs: Union[str, List[str]], msg: bytes) -> dict:
+        """
+        Drop one email in the pickup directory, its envelope in X-Sender and
+        X-Receiver headers (the pickup format of IIS and Exchange)
+        """
+        if isinstance(to_addrs, str):
+            to_addrs = [to_addrs]
+        envelope = [f"X-Sender: {from_addr}\r\n".encode('utf-8')]
+        envelope += [f"X-Receiver: {address}\r\n".encode('utf-8') for address in to_addrs]
+        name = uuid.uuid4().hex
+        temporary = os.path.join(self.directory, f".{name}.tmp")
+        # Written under a hidden name, then renamed, so the MTA never reads a partial file
+        with open(temporary, 'wb') as file:
+            file.write(b''.join(envelope))
+            file.write(msg)
+        os.replace(temporary, os.path.join(self.directory, f"{name}.eml"))
+        return {}
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class PickupDirectoryTransport:
+    def __init__(self, directory: str):
+        """
+        Pickup directory of a local MTA: one .eml file per email
+
+        Args:
+            directory: Directory the MTA watches (created if missing)
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def connect(self, metrics) -> _PickupSession:
+        """
+        Open a session writing to the pickup directory
+        """
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+        return _PickupSession(self.directory)
+
+    def __str__(self) -> str:
+        return f"pickup directory {self.directory}"
+
+
+def open_transport(name: str, host: str, port: int, username: Optional[str] = None,
+                   password: Optional[str] = None, pickup_dir: str = 'pickup'):
+    """
+    Create a transport from its name
+
+    Args:
+        name: 'starttls', 'ssl', 'relay', 'lmtp' or 'pickup'
+        host: Server address (a Unix socket path for LMTP)
+        port: Server port
+        username: Login of the authenticated transports
+        password: Password of the authenticated transports
+        pickup_dir: Directory of the pickup transport
+
+    Raises:
+        ValueError: If the transport is unknown
+    """
+    if name == STARTTLS:
+        return SMTPTransport(host, port, username, password)
+    if name == SSL:
+        return SMTPSSLTransport(host, port, username, password)
+    if name == RELAY:
+        return RelayTransport(host, port)
+    if name == LMTP:
+        return LMTPTransport(host, port)
+    if name == PICKUP:
+        return PickupDirectoryTransport(pickup_dir)
+    raise ValueError(f"Unknown transport {name!r} (expected {', '.join(TRANSPORTS)})")
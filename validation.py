@@ -0,0 +1,166 @@
+"""
+Address validation
+Checks the addresses of a CSV before any SMTP traffic: a compiled syntax
+check, then optionally whether the domain accepts mail (MX record, or an
+address record as the implicit MX), looked up once per domain. Rejected
+addresses are written to a CSV report instead of failing at send time.
+
+The domain check uses dnspython when installed (pip install dnspython) and
+falls back to the system resolver otherwise. Any callable taking a domain and
+returning True/False can replace it, e.g. to run offline.
+"""
+import csv
+import re
+import socket
+import threading
+from typing import Callable, Dict, Optional
+
+try:
+    import dns.resolver
+except ImportError:  # pragma: no cover - optional dependency
+    dns = None
+
+# Dot-atom local part, UTF-8 allowed (RFC 5322/6531 without quoted local parts,
+# which members never use)
+_LOCAL_PART = re.compile(
+    r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~\u0080-\U0010FFFF-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~\u0080-\U0010FFFF-]+)*"
+)
+# Hostname labels of an IDNA-encoded domain, with an alphabetic or IDN (xn--)
+# TLD (no address literals)
+_DOMAIN = re.compile(
+    r"(?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+(?:[A-Za-z]{2,63}|xn--[A-Za-z0-9-]{1,59})"
+)
+MAX_ADDRESS_LENGTH = 254
+MAX_LOCAL_PART_LENGTH = 64
+DNS_TIMEOUT = 5.0
+
+# Resolver errors meaning the domain does not exist
+_NO_SUCH_DOMAIN = {code for code in (getattr(socket, 'EAI_NONAME', None), getattr(socket, 'EAI_NODATA', None))
+                   if code is not None}
+
+
+def domain_accepts_mail(domain: str) -> bool:
+    """
+    Default resolver: True if the domain has an MX record (other than a null
+    MX) or, without MX, an address record
+
+    Raises:
+        Exception: When the lookup itself fails (timeout, no network)
+    """
+    if dns is not None:
+        try:
+            answers = dns.resolver.resolve(domain, 'MX', lifetime=DNS_TIMEOUT)
+            # A single "0 ." record is a null MX: the domain takes no mail (RFC 7505)
+            return any(str(answer.exchange) != '.' for answer in answers)
+        except dns.resolver.NXDOMAIN:
+            return False
+        except dns.resolver.NoAnswer:
+            pass
+    try:
+        socket.getaddrinfo(domain, 25, proto=socket.IPPROTO_TCP)
+        return True
+    except socket.gaierror as e:
+        if e.errno in _NO_SUCH_DOMAIN:
+            return False
+        raise
+
+
+class AddressValidator:
+    def __init__(self, check_domains: bool = False, resolver: Optional[Callable[[str], bool]] = None):
+        """
+        Initialize the validator
+
+        Args:
+            check_domains: Also check that the domain of each address accepts mail
+            resolver: Callable telling whether a domain accepts mail (defaults
+                to domain_accepts_mail); called once per domain
+        """
+        self.check_domains = check_domains
+        self.resolver = resolver or domain_accepts_mail
+        self._domains: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+
+    def _domain_ok(self, domain: str) -> bool:
+        domain = domain.lower()
+        with self._lock:
+            known = self._domains.get(domain)
+        if known is not None:
+            return known
+        self.lookups += 1
+        try:
+            accepts = bool(self.resolver(domain))
+        except Exception:
+            # Lookup failed: let the SMTP server decide
+            accepts = True
+        with self._lock:
+            self._domains[domain] = accepts
+        return accepts
+
+    def check(self, address: str) -> Optional[str]:
+        """
+        Check one address
+
+        Returns:
+            Why the address is rejected, or None if it looks deliverable
+        """
+        if len(address) > MAX_ADDRESS_LENGTH:
+            return "address too long"
+        local_part, at, domain = address.rpartition('@')
+        if not at or _LOCAL_PART.fullmatch(local_part) is None:
+            return "invalid syntax"
+        try:
+            # Internationalized domains are checked and looked up in their ASCII form
+            ascii_domain = domain if domain.isascii() else domain.encode('idna').decode('ascii')
+        except UnicodeError:
+            return "invalid domain"
+        if _DOMAIN.fullmatch(ascii_domain) is None:
+            return "invalid syntax"
+        # Limits are in octets (RFC 5321), a UTF-8 character taking up to four
+        local_length = len(local_part.encode('utf-8'))
+        if local_length > MAX_LOCAL_PART_LENGTH:
+            return "local part too long"
+        if local_length + 1 + len(ascii_domain) > MAX_ADDRESS_LENGTH:
+            return "address too long"
+        if self.check_domains and not self._domain_ok(ascii_domain):
+            return f"domain {domain} does not accept mail"
+        return None
+
+
+class RejectReport:
+    def __init__(self, path: str):
+        """
+        CSV report of rejected addresses (created on the first rejection)
+
+        Args:
+            path: Output file (overwritten)
+        """
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def add(self, source: str, name: str, column: str, address: str, reason: str):
+        """
+        Record one rejected address
+
+        Args:
+            source: CSV file the address comes from
+            name: Member name
+            column: CSV column of the address (mailSesame or mailAutre)
+            address: Rejected address
+            reason: Why it was rejected
+        """
+        with self._lock:
+            if self._writer is None:
+                self._file = open(self.path, 'w', encoding='utf-8', newline='')
+                self._writer = csv.writer(self._file)
+                self._writer.writerow(['file', 'name', 'column', 'address', 'reason'])
+            self._writer.writerow([source, name, column, address, reason])
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and not self._file.closed:
+                self._file.close()